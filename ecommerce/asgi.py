@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+Serve it with uvicorn to get the async read endpoints under /async/:
+
+    uvicorn ecommerce.asgi:application --workers 4
 """
 
 import os
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
+import tempfile
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,7 +47,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "ecommerce_app.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "ecommerce_app.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -96,10 +99,76 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': DATABASE_DIR,
+        # Writers wait up to 20s for the write lock, transactions that change stock write first (see ecommerce_app/reservations.py)
+        'OPTIONS': {'timeout': 20},
+        # A file, not shared memory, so the concurrency tests' threads wait on the lock like separate workers do
+        'TEST': {'NAME': os.path.join(tempfile.gettempdir(), 'ecommerce_test_db.sqlite3')},
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+def cache_config(name, timeout, max_entries):
+    """
+    Cache Alias Configured From `<NAME>_CACHE_*` Environment Variables
+    * BACKEND: locmem (default), file, memcached or redis
+    * locmem evicts least recently used entries past MAX_ENTRIES, every backend expires entries after TIMEOUT
+    """
+    backend = config(f'{name}_CACHE_BACKEND', default='locmem')
+    cache = {
+        'BACKEND': CACHE_BACKENDS[backend],
+        'LOCATION': config(f'{name}_CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache', name.lower()) if backend == 'file' else name.lower()),
+        'TIMEOUT': config(f'{name}_CACHE_TIMEOUT', default=timeout, cast=int),
+    }
+    if backend in ('locmem', 'file'):
+        cache['OPTIONS'] = {'MAX_ENTRIES': config(f'{name}_CACHE_MAX_ENTRIES', default=max_entries, cast=int)}
+    return cache
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS['locmem'],
+    },
+    # Serialized product pages & details, keyed by catalog version (see ecommerce_app/cache.py)
+    # With locmem every worker caches its own copy & the version is read from the database, a shared backend
+    # (CATALOG_CACHE_BACKEND=redis or memcached) keeps one copy & the version with it
+    'catalog': cache_config('CATALOG', timeout=300, max_entries=1000),
+    # Anonymous carts (see ecommerce_app/guest_cart.py), expiring a week after the last change by default
+    # Only holds the carts with a shared backend (GUEST_CART_CACHE_BACKEND=redis or memcached), the TIMEOUT is used either way
+    'guest_carts': cache_config('GUEST_CART', timeout=7 * 24 * 60 * 60, max_entries=100000),
+    # Authenticated user snapshots (see ecommerce_app/authentication.py), only used with a shared backend
+    # (AUTH_USER_CACHE_BACKEND=redis or memcached), a process local cache can't be invalidated from other workers
+    'auth_users': cache_config('AUTH_USER', timeout=60, max_entries=10000),
+}
+
+
+# Guest carts
+# Anonymous carts are kept in GUEST_CART_STORE and only written to Cart on login, they expire GUEST_CART_TTL seconds after the last change
+# GuestCart rows by default, the guest_carts cache when it is shared by every worker (redis or memcached)
+# The session only carries the cart id, signed cookies keep it out of the database
+GUEST_CART_CACHE_ALIAS = 'guest_carts'
+GUEST_CART_STORE = config('GUEST_CART_STORE', default=(
+    'ecommerce_app.guest_cart.CacheGuestCartStore'
+    if CACHES[GUEST_CART_CACHE_ALIAS]['BACKEND'] in (CACHE_BACKENDS['memcached'], CACHE_BACKENDS['redis'])
+    else 'ecommerce_app.guest_cart.DatabaseGuestCartStore'
+))
+GUEST_CART_TTL = CACHES[GUEST_CART_CACHE_ALIAS]['TIMEOUT']
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.signed_cookies')
+
+
+# Stock reservations
+# Checkout holds stock for this long, unpaid holds are returned by the expire_stock_holds sweeper
+STOCK_HOLD_MINUTES = config('STOCK_HOLD_MINUTES', default=15, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -145,16 +214,72 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # MEDIA_URL is the URL to access media files
 MEDIA_URL = '/media/'
 
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'ecommerce_app.file_serving.CompressedManifestStaticFilesStorage'},
+}
+
+# Static & media serving (see ecommerce_app/file_serving.py)
+# FILE_SERVING_ACCEL: '' streams from Python, 'x-accel-redirect' hands the body to nginx through the internal
+# locations below (aliased to STATIC_ROOT & MEDIA_ROOT, with gzip_static / brotli_static on), 'x-sendfile' to
+# Apache mod_xsendfile or lighttpd
+FILE_SERVING_ACCEL = config('FILE_SERVING_ACCEL', default='')
+FILE_SERVING_ACCEL_LOCATIONS = {
+    'static': config('STATIC_ACCEL_LOCATION', default='/internal/static/'),
+    'media': config('MEDIA_ACCEL_LOCATION', default='/internal/media/'),
+}
+# Unhashed static names & media are revalidated with their ETag after this many seconds
+STATIC_CACHE_MAX_AGE = config('STATIC_CACHE_MAX_AGE', default=3600, cast=int)
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=3600, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    ]
+        'ecommerce_app.authentication.CachedJWTAuthentication',
+    ],
+    # orjson backed JSON (see ecommerce_app/renderers.py), the stock DRF classes take over without the `orjson` package
+    'DEFAULT_RENDERER_CLASSES': [
+        'ecommerce_app.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'ecommerce_app.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Password hashing pool (see ecommerce_app/passwords.py)
+# A login waiting on the pool still holds its request thread, keep WORKERS + MAX_PENDING well below the server's
+# threads per process so catalog requests always find a free thread
+# 0 hashes in the request thread, the default on Vercel (VERCEL=1) where serverless functions can't start processes
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=0 if config('VERCEL', default=False, cast=bool) else 2, cast=int)
+PASSWORD_HASH_MAX_PENDING = config('PASSWORD_HASH_MAX_PENDING', default=2, cast=int)
+PASSWORD_HASH_NICE = config('PASSWORD_HASH_NICE', default=10, cast=int)
+PASSWORD_HASH_TIMEOUT = config('PASSWORD_HASH_TIMEOUT', default=10, cast=int)
+
+# Request metrics (see ecommerce_app/metrics.py)
+# Scraped from /metrics/ with `Authorization: Bearer <METRICS_TOKEN>`, without a token only served when DEBUG is on
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Response compression (see ecommerce_app/compression.py), brotli needs the optional `brotli` package
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=4, cast=int)
+
+# Product image variants (see ecommerce_app/images.py)
+# Uploads queue their resizing in this pool, images it turns away are left to `manage.py generate_image_variants`
+IMAGE_VARIANT_WORKERS = config('IMAGE_VARIANT_WORKERS', default=1, cast=int)
+IMAGE_VARIANT_MAX_PENDING = config('IMAGE_VARIANT_MAX_PENDING', default=100, cast=int)
+IMAGE_VARIANT_NICE = config('IMAGE_VARIANT_NICE', default=10, cast=int)
+
+# Authenticated user snapshots (see ecommerce_app/authentication.py)
+AUTH_USER_CACHE_ALIAS = 'auth_users'
+AUTH_USER_CACHE_TIMEOUT = CACHES[AUTH_USER_CACHE_ALIAS]['TIMEOUT']
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=2),
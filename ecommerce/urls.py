@@ -16,17 +16,14 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
-from django.conf import settings
 from django.urls import re_path
-from django.views.static import serve
+
+from ecommerce_app.file_serving import serve_media, serve_static
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("ecommerce_app.urls")),
 
-    re_path(r'^media/(?P<path>.*)$', serve,{'document_root': settings.MEDIA_ROOT}),
-    re_path(r'^static/(?P<path>.*)$', serve,{'document_root': settings.STATIC_ROOT}),
-]
-urlpatterns += static(settings.MEDIA_URL, document_root = settings.MEDIA_ROOT)
-urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
+    re_path(r'^media/(?P<path>.*)$', serve_media),
+    re_path(r'^static/(?P<path>.*)$', serve_static),
+]
\ No newline at end of file
@@ -7,3 +7,8 @@ class EcommerceAppConfig(AppConfig):
 
     def ready(self):
         import ecommerce_app.signals  
+        from django.conf import settings
+        from ecommerce_app import metrics
+
+        if settings.METRICS_ENABLED:
+            metrics.install()
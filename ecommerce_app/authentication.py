@@ -0,0 +1,101 @@
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from ecommerce_app.cache import is_process_local
+from ecommerce_app.models.user import User
+
+# Every column but the password hash, in model field order as User.from_db expects
+USER_SNAPSHOT_FIELDS = [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+
+
+def user_snapshot_key(user_id):
+    return f'auth:user:v2:{user_id}'
+
+
+def invalidate_user_snapshot(user_id):
+    caches[settings.AUTH_USER_CACHE_ALIAS].delete(user_snapshot_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication Reading A User Snapshot From The Cache Instead Of Loading The User Row On Every Request
+    * A warm cache authenticates without any query
+    * The snapshot holds every field but the password hash, which is only loaded if something reads it
+    * Snapshots live AUTH_USER_CACHE_TIMEOUT seconds and are dropped as soon as the user is saved
+    * A process local AUTH_USER_CACHE_ALIAS is not used, the drop would only reach the worker that saved the user,
+      every request loads the user row instead
+    """
+    def get_cache(self):
+        cache = caches[settings.AUTH_USER_CACHE_ALIAS]
+        return None if is_process_local(cache) else cache
+
+    def get_user(self, validated_token):
+        cache = self.get_cache()
+        if cache is None or api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares against the password hash, which the snapshot doesn't carry
+            return super().get_user(validated_token)
+
+        user_id = self.get_user_id(validated_token)
+        key = user_snapshot_key(user_id)
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = self.snapshot_queryset(user_id).first()
+            if snapshot is not None:
+                cache.set(key, snapshot, settings.AUTH_USER_CACHE_TIMEOUT)
+        return self.user_from_snapshot(snapshot)
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() For Async Views, Same Checks With The Cache & ORM Awaited
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        cache = self.get_cache()
+        if cache is None or api_settings.CHECK_REVOKE_TOKEN:
+            return await sync_to_async(super().get_user)(validated_token)
+
+        user_id = self.get_user_id(validated_token)
+        key = user_snapshot_key(user_id)
+        snapshot = await cache.aget(key)
+        if snapshot is None:
+            snapshot = await self.snapshot_queryset(user_id).afirst()
+            if snapshot is not None:
+                await cache.aset(key, snapshot, settings.AUTH_USER_CACHE_TIMEOUT)
+        return self.user_from_snapshot(snapshot)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def snapshot_queryset(self, user_id):
+        return User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values_list(*USER_SNAPSHOT_FIELDS)
+
+    def user_from_snapshot(self, snapshot):
+        if snapshot is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        user = User.from_db(DEFAULT_DB_ALIAS, USER_SNAPSHOT_FIELDS, snapshot)
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
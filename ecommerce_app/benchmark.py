@@ -0,0 +1,371 @@
+from datetime import timedelta
+from decimal import Decimal
+import random
+from urllib.parse import urlencode
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.utils import timezone
+
+from ecommerce_app import search
+from ecommerce_app.guest_cart import get_guest_cart_store
+from ecommerce_app.models.admin import Brand, Category, Product, ProductCard, ProductImage
+from ecommerce_app.models.user import User, Cart, ProductPurchase, StockReservation
+from ecommerce_app.utils import STATUS_CHOICES, RESERVATION_STATUS
+
+# Benchmark Dataset & Traffic Mixes
+# * seed_dataset() bulk inserts a large catalog, marked so clear_dataset() can take it out again
+# * TRAFFIC_MIXES lists weighted requests covering every route in ecommerce_app/urls.py, replayed by run_benchmark
+
+BENCH_EMAIL_DOMAIN = 'bench.example.com'
+BENCH_ADMIN_EMAIL = f'admin@{BENCH_EMAIL_DOMAIN}'
+BENCH_PASSWORD = 'bench-password'
+BENCH_NAME_PREFIX = 'bench'
+RUN_NAME_PREFIX = 'bench-run'
+PAGE_SIZE = 10
+
+ACTIVE = STATUS_CHOICES[1][0]
+# 8 in 10 rows active, the rest inactive or soft deleted, like a catalog that's been live for a while
+STATUS_MIX = [ACTIVE] * 8 + [STATUS_CHOICES[0][0], STATUS_CHOICES[2][0]]
+
+PRODUCT_WORDS = [
+    'classic', 'wireless', 'organic', 'slim', 'heavy', 'compact', 'smart', 'vintage', 'portable', 'premium',
+    'shirt', 'phone', 'lamp', 'kettle', 'jacket', 'speaker', 'backpack', 'watch', 'blender', 'sneaker',
+]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def summarize_latencies(latencies):
+    """
+    p50/p95/p99/Mean/Max In Milliseconds Of A List Of Durations In Seconds
+    """
+    latencies = sorted(latencies)
+    return {
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+def seed_dataset(products=1_000_000, users=100_000, category_depth=5, category_width=5, cart_users=1000, cart_lines=50,
+                 guest_carts=1000, images_per_product=1, batch_size=5000, log=None):
+    """
+    Bulk Insert A Benchmark Catalog
+    * A category forest `category_depth` levels deep with `category_width` children per node, products spread over every node
+    * Users share one password hash, `cart_users` of them get `cart_lines` active cart lines each
+    * `guest_carts` anonymous carts with `cart_lines` lines each go to the guest cart store, see seed_guest_carts()
+    * Every user gets one purchase with its stock hold
+    * bulk_create skips signals, so callers reindex search, rebuild the product cards & bump the catalog version afterwards
+    """
+    log = log or (lambda message: None)
+    rng = random.Random(0)
+    now = timezone.now()
+
+    with transaction.atomic():
+        brands = Brand.objects.bulk_create(
+            [Brand(name=f'{BENCH_NAME_PREFIX}-brand-{index}') for index in range(max(products // 1000, 1))],
+            batch_size=batch_size,
+        )
+
+        categories = []
+        level = [None]
+        for depth in range(category_depth):
+            level = Category.objects.bulk_create([
+                Category(name=f'{BENCH_NAME_PREFIX}-category-{depth}-{uuid.uuid4().hex[:12]}', parent=parent)
+                for parent in level for _ in range(category_width)
+            ], batch_size=batch_size)
+            categories.extend(level)
+        log(f'{len(brands)} brands, {len(categories)} categories')
+
+    # Products & images in chunks, keeping a sample of active ids for carts & purchases
+    active_ids = []
+    wanted_ids = max(cart_users * cart_lines, users)
+    for start in range(0, products, batch_size):
+        with transaction.atomic():
+            chunk = [
+                Product(
+                    name=f'{rng.choice(PRODUCT_WORDS[:10])} {rng.choice(PRODUCT_WORDS[10:])} {index}',
+                    brand=brands[index % len(brands)],
+                    category=categories[index % len(categories)],
+                    price=Decimal(100 + index % 900),
+                    stock=index % 200,
+                    status=STATUS_MIX[index % len(STATUS_MIX)],
+                )
+                for index in range(start, min(start + batch_size, products))
+            ]
+            Product.objects.bulk_create(chunk)
+            ProductImage.objects.bulk_create([
+                ProductImage(product=product, image=f'product_images/{BENCH_NAME_PREFIX}-{product.id.hex}-{position}.jpg')
+                for product in chunk for position in range(images_per_product)
+            ])
+        if len(active_ids) < wanted_ids:
+            active_ids.extend(product.id for product in chunk if product.status == ACTIVE)
+        if (start // batch_size + 1) % 20 == 0:
+            log(f'{min(start + batch_size, products)} products')
+
+    password = make_password(BENCH_PASSWORD)
+    user_ids = []
+    for start in range(0, users, batch_size):
+        with transaction.atomic():
+            chunk = User.objects.bulk_create([
+                User(email=f'user-{index}@{BENCH_EMAIL_DOMAIN}', first_name=f'user {index}', password=password,
+                     user_currency='rupee', status=STATUS_MIX[index % len(STATUS_MIX)])
+                for index in range(start, min(start + batch_size, users))
+            ])
+        user_ids.extend(user.id for user in chunk if user.status == ACTIVE)
+    if not User.objects.filter(email=BENCH_ADMIN_EMAIL).exists():
+        User.objects.create(email=BENCH_ADMIN_EMAIL, first_name='bench admin', password=password, user_currency='rupee',
+                            is_superadmin=True, is_staff=True, is_admin=True)
+    log(f'{users} users')
+
+    with transaction.atomic():
+        Cart.objects.bulk_create([
+            Cart(user_id=user_id, product_id=active_ids[(position * cart_lines + line) % len(active_ids)], quantity=1 + line % 3)
+            for position, user_id in enumerate(user_ids[:cart_users]) for line in range(cart_lines)
+        ], batch_size=batch_size)
+        purchases = ProductPurchase.objects.bulk_create([
+            ProductPurchase(user_id=user_id, Product_id=active_ids[position % len(active_ids)], product_price=Decimal('100.00'),
+                            quantity=1, status=STATUS_MIX[position % len(STATUS_MIX)])
+            for position, user_id in enumerate(user_ids)
+        ], batch_size=batch_size)
+        StockReservation.objects.bulk_create([
+            StockReservation(user_id=purchase.user_id, product_id=purchase.Product_id, purchase=purchase, quantity=1,
+                             reservation_status=RESERVATION_STATUS[0][0] if position % 10 == 0 else RESERVATION_STATUS[1][0],
+                             expires_at=now + timedelta(minutes=position % 30 - 15))
+            for position, purchase in enumerate(purchases)
+        ], batch_size=batch_size)
+    seed_guest_carts(guest_carts, cart_lines, active_ids)
+    log(f'{min(cart_users, len(user_ids)) * cart_lines} cart lines, {guest_carts} guest carts, {len(purchases)} purchases')
+
+
+def seed_guest_carts(count, lines, product_ids):
+    """
+    Anonymous Carts In The Guest Cart Store, Ids `bench-0` To `bench-<count - 1>`
+    * TrafficContext seeds its own when it finds none, e.g. after a login took them over
+    """
+    store = get_guest_cart_store()
+    for position in range(count):
+        store.replace(f'{BENCH_NAME_PREFIX}-{position}', {
+            product_ids[(position + line) % len(product_ids)]: 1 for line in range(lines)
+        })
+
+
+def guest_cart_ids(limit):
+    """
+    Ids Of The Seeded Guest Carts Still In The Store, Up To `limit`
+    """
+    store = get_guest_cart_store()
+    ids = []
+    while len(ids) < limit and store.load(f'{BENCH_NAME_PREFIX}-{len(ids)}'):
+        ids.append(f'{BENCH_NAME_PREFIX}-{len(ids)}')
+    return ids
+
+
+def clear_dataset():
+    """
+    Delete Everything seed_dataset() & Benchmark Runs Created
+    * Raw DELETEs, children first, the cascade collector would load every row & send its signals
+    * The deleted objects are dropped from the search index & their product cards here, callers bump the catalog version
+    """
+    users = User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}')
+    products = Product.objects.filter(brand__name__startswith=f'{BENCH_NAME_PREFIX}-brand-')
+    brands = Brand.objects.filter(name__startswith=f'{BENCH_NAME_PREFIX}-')
+    categories = Category.objects.filter(name__startswith=f'{BENCH_NAME_PREFIX}-')
+    indexed = {
+        'product': list(products.values_list('id', flat=True)),
+        'brand': list(brands.values_list('id', flat=True)),
+        'category': list(categories.values_list('id', flat=True)),
+    }
+    with transaction.atomic():
+        clear_run()
+        for queryset in [
+            StockReservation.objects.filter(user__in=users),
+            ProductPurchase.objects.filter(user__in=users),
+            Cart.objects.filter(user__in=users),
+            ProductImage.objects.filter(product__in=products),
+            ProductCard.objects.filter(id__in=products.values('id')),
+            products,
+            brands,
+            categories,
+            users,
+        ]:
+            queryset._raw_delete(queryset.db)
+        # Reindexing ids that no longer exist removes their rows
+        for object_type, ids in indexed.items():
+            search.index_objects(object_type, ids)
+
+    store = get_guest_cart_store()
+    for cart_id in guest_cart_ids(float('inf')):
+        store.clear(cart_id)
+
+
+def clear_run():
+    """
+    Delete The Rows A Benchmark Run's Create Requests Added
+    """
+    Product.objects.filter(name__startswith=RUN_NAME_PREFIX).delete()
+    Brand.objects.filter(name__startswith=RUN_NAME_PREFIX).delete()
+    User.objects.filter(email__startswith=f'{RUN_NAME_PREFIX}-').delete()
+
+
+class TrafficContext:
+    """
+    Ids The Traffic Mixes Pick From, Sampled Once From The Seeded Dataset
+    """
+    def __init__(self, rng, sample_size=2000):
+        self.rng = rng
+        active = {'status': ACTIVE}
+        self.products = list(Product.objects.filter(**active).values_list('id', flat=True)[:sample_size])
+        brands = Brand.objects.filter(name__startswith=f'{BENCH_NAME_PREFIX}-', **active)
+        self.brands = list(brands.values_list('id', flat=True)[:sample_size])
+        self.brand_names = list(brands.values_list('name', flat=True)[:sample_size])
+        self.brand_pages = max(Brand.objects.filter(**active).count() // PAGE_SIZE, 1)
+        # Category pages near the leaves, a root's tree is the whole catalog
+        deepest = Category.objects.filter(children__isnull=True, **active).values_list('parent_id', flat=True)
+        self.categories = list(Category.objects.filter(id__in=deepest[:sample_size], **active).values_list('id', flat=True))
+        self.category_names = list(Category.objects.filter(id__in=self.categories).values_list('name', flat=True))
+        self.users = list(
+            User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}', is_superadmin=False, **active).values_list('id', 'email')[:sample_size]
+        )
+        shopper_ids = Cart.objects.filter(status=ACTIVE, user__email__endswith=f'@{BENCH_EMAIL_DOMAIN}').values_list('user_id', flat=True)
+        self.shoppers = list(User.objects.filter(id__in=shopper_ids[:sample_size]).values_list('id', flat=True).distinct())
+        self.guest_carts = guest_cart_ids(sample_size)
+        if not self.guest_carts and self.products:
+            # Seeded by another process into a process local store
+            seed_guest_carts(min(sample_size, 100), PAGE_SIZE * 5, self.products)
+            self.guest_carts = guest_cart_ids(sample_size)
+        self.counter = 0
+
+    def pick(self, values):
+        return self.rng.choice(values)
+
+    def unique(self):
+        self.counter += 1
+        return f'{uuid.uuid4().hex[:8]}-{self.counter}'
+
+    def cart_line(self, user_id, field='id'):
+        return Cart.objects.filter(user_id=user_id, status=ACTIVE).values_list(field, flat=True).first()
+
+    def guest_login(self, cart_id):
+        """
+        Login Data For A Session Holding `cart_id`, Refilling The Guest Cart An Earlier Login Took Over
+        """
+        store = get_guest_cart_store()
+        if not store.load(cart_id):
+            store.replace(cart_id, {product_id: 1 for product_id in self.rng.sample(self.products, min(PAGE_SIZE * 5, len(self.products)))})
+        return {'email': self.pick(self.users)[1], 'password': BENCH_PASSWORD}
+
+    def export_query(self):
+        # The last hour of orders, both formats
+        return urlencode({'export_format': self.pick(['csv', 'ndjson']), 'created_from': (timezone.now() - timedelta(hours=1)).isoformat()})
+
+    def import_file(self, rows=20):
+        """
+        A CSV Upload Of `rows` New Products, Named So clear_run() Removes Them
+        """
+        lines = ['name,brand,category,price,stock,images'] + [
+            f'{RUN_NAME_PREFIX} import {self.unique()},{self.pick(self.brand_names)},{self.pick(self.category_names)},120.00,10,'
+            f'product_images/{RUN_NAME_PREFIX}-import.jpg'
+            for _ in range(rows)
+        ]
+        return SimpleUploadedFile('products.csv', '\n'.join(lines).encode(), content_type='text/csv')
+
+    def created_user(self):
+        # delete_user works through the users create_user made, falling back to a seeded one
+        user_id = User.objects.filter(email__startswith=f'{RUN_NAME_PREFIX}-', status=ACTIVE).values_list('id', flat=True).first()
+        return user_id or self.pick(self.users)[0]
+
+
+# Each request: (name, weight, role, build(context, user_id) -> (method, path, data))
+# role picks the credentials: 'admin' the seeded superadmin, 'shopper' a user with a big cart, 'guest' a session holding
+# a seeded guest cart (its id is passed as user_id), 'metrics' METRICS_TOKEN, None nothing
+# data holding a file is sent as multipart, any other data as JSON
+REQUESTS = {
+    # Catalog
+    'product_list': ('admin', lambda c, u: ('get', f'/products/?page={c.rng.randint(1, 50)}', None)),
+    'product_list_keyset': ('admin', lambda c, u: ('get', '/products/?cursor=', None)),
+    'product_search': ('admin', lambda c, u: ('get', f'/products/?search={c.pick(PRODUCT_WORDS)}', None)),
+    'product_detail': ('admin', lambda c, u: ('get', f'/products/{c.pick(c.products)}/', None)),
+    'product_create': ('admin', lambda c, u: ('post', '/products/', {
+        'name': f'{RUN_NAME_PREFIX} product {c.unique()}', 'brand': str(c.pick(c.brands)), 'category': str(c.pick(c.categories)),
+        'price': '120.00', 'stock': 10, 'images': ['placeholder'],
+    })),
+    'product_update': ('admin', lambda c, u: ('patch', f'/products/{c.pick(c.products)}/', {'price': f'{c.rng.randint(100, 999)}.00'})),
+    'product_availability': ('shopper', lambda c, u: ('post', '/products/availability/', {
+        'product_ids': [str(c.pick(c.products)) for _ in range(50)],
+    })),
+    'product_cards': ('shopper', lambda c, u: ('get', f'/products/cards/?page={c.rng.randint(1, 50)}', None)),
+    'product_cards_category': ('shopper', lambda c, u: ('get', f'/products/cards/?category={c.pick(c.categories)}&cursor=', None)),
+    'brand_list': ('admin', lambda c, u: ('get', f'/brands/?page={c.rng.randint(1, c.brand_pages)}', None)),
+    'brand_create': ('admin', lambda c, u: ('post', '/brands/', {'name': f'{RUN_NAME_PREFIX}-brand-{c.unique()}'})),
+    'brand_detail': ('admin', lambda c, u: ('get', f'/brands/{c.pick(c.brands)}/', None)),
+    'brand_update': ('admin', lambda c, u: ('patch', f'/brands/{c.pick(c.brands)}/', {'description': c.unique()})),
+    'category_list': ('admin', lambda c, u: ('get', '/categories/?cursor=', None)),
+    'category_detail': ('admin', lambda c, u: ('get', f'/categories/{c.pick(c.categories)}/', None)),
+    'category_update': ('admin', lambda c, u: ('patch', f'/categories/{c.pick(c.categories)}/', {'description': c.unique()})),
+    # Users
+    'create_user': (None, lambda c, u: ('post', '/create_user/', {
+        'email': f'{RUN_NAME_PREFIX}-{c.unique()}@{BENCH_EMAIL_DOMAIN}', 'password': BENCH_PASSWORD, 'first_name': 'bench', 'user_currency': 'rupee',
+    })),
+    'login': (None, lambda c, u: ('post', '/login/', {'email': c.pick(c.users)[1], 'password': BENCH_PASSWORD})),
+    # Login from a session with a guest cart, which is written into the user's cart
+    'login_with_guest_cart': ('guest', lambda c, u: ('post', '/login/', c.guest_login(u))),
+    'user_list': ('admin', lambda c, u: ('get', f'/user_list/?page={c.rng.randint(1, 50)}', None)),
+    'get_user': ('admin', lambda c, u: ('get', f'/get_user/{c.pick(c.users)[0]}/', None)),
+    'update_user': ('admin', lambda c, u: ('patch', f'/update_user/{c.pick(c.users)[0]}/', {'last_name': c.unique()})),
+    'delete_user': ('admin', lambda c, u: ('delete', f'/delete_user/{c.created_user()}/', None)),
+    # Cart
+    'cart_list': ('shopper', lambda c, u: ('get', '/carts/', None)),
+    'cart_add': ('shopper', lambda c, u: ('post', '/carts/', {'user': str(u), 'product': str(c.pick(c.products)), 'quantity': 1})),
+    'cart_retrieve': ('shopper', lambda c, u: ('get', f'/carts/{c.cart_line(u)}/', None)),
+    'cart_update': ('shopper', lambda c, u: ('patch', f'/carts/{c.cart_line(u)}/', {'quantity': 1})),
+    'cart_search': ('shopper', lambda c, u: ('get', f"/carts/search/{c.cart_line(u, 'product_id')}/", None)),
+    'cart_remove': ('shopper', lambda c, u: ('delete', f'/carts/{c.cart_line(u)}/', None)),
+    # Orders, imports & operations
+    'orders_export': ('admin', lambda c, u: ('get', f'/orders/export/?{c.export_query()}', None)),
+    'product_import': ('admin', lambda c, u: ('post', '/products/import/', {'file': c.import_file()})),
+    'metrics': ('metrics', lambda c, u: ('get', '/metrics/', None)),
+    # Async read API's
+    'async_product_list': ('admin', lambda c, u: ('get', f'/async/products/?page={c.rng.randint(1, 50)}', None)),
+    'async_product_detail': ('admin', lambda c, u: ('get', f'/async/products/{c.pick(c.products)}/', None)),
+    'async_category_list': ('admin', lambda c, u: ('get', '/async/categories/?cursor=', None)),
+    'async_category_detail': ('admin', lambda c, u: ('get', f'/async/categories/{c.pick(c.categories)}/', None)),
+    'async_cart_list': ('shopper', lambda c, u: ('get', '/async/carts/', None)),
+}
+
+# Weighted request names, `all` hits every route equally
+TRAFFIC_MIXES = {
+    'browse': {
+        'product_list': 30, 'product_list_keyset': 10, 'product_search': 15, 'product_detail': 30,
+        'category_list': 5, 'category_detail': 10,
+    },
+    'shopper': {
+        'product_detail': 25, 'product_availability': 10, 'product_cards': 10, 'product_cards_category': 5, 'cart_list': 20,
+        'cart_add': 20, 'cart_retrieve': 5, 'cart_update': 10, 'cart_search': 5, 'cart_remove': 5,
+    },
+    'admin': {
+        'user_list': 15, 'get_user': 10, 'update_user': 5, 'brand_list': 10, 'brand_detail': 5, 'brand_update': 5,
+        'brand_create': 2, 'category_update': 5, 'product_create': 5, 'product_update': 10, 'product_list': 20,
+        'create_user': 4, 'delete_user': 4, 'orders_export': 1, 'product_import': 2, 'metrics': 5,
+    },
+    'auth': {'login': 60, 'login_with_guest_cart': 20, 'create_user': 20},
+    'async': {
+        'async_product_list': 30, 'async_product_detail': 30, 'async_category_list': 10, 'async_category_detail': 10,
+        'async_cart_list': 20,
+    },
+    'all': {name: 1 for name in REQUESTS},
+}
+TRAFFIC_MIXES['storefront'] = {
+    **{name: weight * 6 for name, weight in TRAFFIC_MIXES['browse'].items()},
+    **{name: weight * 3 for name, weight in TRAFFIC_MIXES['shopper'].items() if name not in TRAFFIC_MIXES['browse']},
+    'login': 3, 'login_with_guest_cart': 1, 'create_user': 1, 'metrics': 1,
+}
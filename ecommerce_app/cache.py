@@ -0,0 +1,142 @@
+import hashlib
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import F
+
+from ecommerce_app.models.admin import CatalogVersion
+
+# Catalog Cache
+# * Entries are keyed by the catalog version, a write bumps the version instead of deleting entries
+# * The version has to be seen by every worker: with a shared backend (file, memcached, redis) it lives in the cache,
+#   with a process local one (locmem) it lives in the CatalogVersion row, one primary key read per catalog read,
+#   so a bump made by one worker retires the entries of all of them
+
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_VERSION_KEY = 'catalog:version'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_catalog_cache():
+    return caches[CATALOG_CACHE_ALIAS]
+
+
+def _initial_catalog_version():
+    # Seed from the clock so a version key lost to eviction never reuses an older number
+    return int(time.time() * 1000)
+
+
+def is_process_local(cache):
+    """
+    Whether Entries Of `cache` Are Only Seen By The Process That Wrote Them
+    """
+    return isinstance(cache, LocMemCache)
+
+
+def get_catalog_version():
+    """
+    Current Catalog Version, Part Of Every Catalog Cache Key
+    """
+    cache = get_catalog_cache()
+    if is_process_local(cache):
+        version = CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).first()
+        if version is None:
+            version = CatalogVersion.objects.get_or_create(pk=1, defaults={'version': _initial_catalog_version()})[0].version
+        return version
+
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, _initial_catalog_version(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Move The Catalog To A New Version, So Every Cached Entry Of The Previous Version Is Never Served Again
+    """
+    cache = get_catalog_cache()
+    if is_process_local(cache):
+        # One atomic UPDATE, concurrent bumps never lose an increment
+        if not CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1):
+            CatalogVersion.objects.get_or_create(pk=1, defaults={'version': _initial_catalog_version()})
+            CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1)
+        return CatalogVersion.objects.values_list('version', flat=True).get(pk=1)
+
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.add(CATALOG_VERSION_KEY, _initial_catalog_version(), timeout=None)
+        return cache.incr(CATALOG_VERSION_KEY)
+
+
+async def aget_catalog_version():
+    cache = get_catalog_cache()
+    if is_process_local(cache):
+        version = await CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).afirst()
+        if version is None:
+            version = (await CatalogVersion.objects.aget_or_create(pk=1, defaults={'version': _initial_catalog_version()}))[0].version
+        return version
+
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, _initial_catalog_version(), timeout=None)
+        version = await cache.aget(CATALOG_VERSION_KEY)
+    return version
+
+
+def make_catalog_key(*parts, version=None):
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'catalog:v{version or get_catalog_version()}:{digest}'
+
+
+def get_or_set_catalog_entry(parts, producer):
+    """
+    Read Through The Catalog Cache
+    * Returns the cached value for `parts` on the current catalog version or stores what `producer()` returns
+    * `None` results are not cached
+    """
+    cache = get_catalog_cache()
+    key = make_catalog_key(*parts)
+    value = cache.get(key)
+    if value is not None:
+        _record('hits')
+        return value
+
+    _record('misses')
+    value = producer()
+    if value is not None:
+        cache.set(key, value)
+    return value
+
+
+async def aget_or_set_catalog_entry(parts, producer):
+    """
+    get_or_set_catalog_entry() For Async Views, `producer` Is A Coroutine Function
+    """
+    cache = get_catalog_cache()
+    key = make_catalog_key(*parts, version=await aget_catalog_version())
+    value = await cache.aget(key)
+    if value is not None:
+        _record('hits')
+        return value
+
+    _record('misses')
+    value = await producer()
+    if value is not None:
+        await cache.aset(key, value)
+    return value
+
+
+def _record(counter):
+    with _stats_lock:
+        _stats[counter] += 1
+
+
+def catalog_cache_stats():
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from ecommerce_app.file_serving import COMPRESSIBLE_TYPES, accepted_encodings, brotli
+
+# Response Compression
+# * JSON, CSV/NDJSON exports & other text bodies of at least COMPRESSION_MIN_SIZE bytes are compressed on the fly,
+#   images, partial content & bodies that already have a Content-Encoding (precompressed static files) are left alone
+# * Brotli when the optional `brotli` package is installed & the client accepts it, gzip otherwise,
+#   streaming bodies are always gzip (GZipMiddleware compresses them chunk by chunk)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if response.status_code == 206 or not COMPRESSIBLE_TYPES.match(content_type):
+            return response
+        if response.streaming or response.has_header('Content-Encoding'):
+            return super().process_response(request, response)
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        if brotli and 'br' in accepted_encodings(request.headers.get('Accept-Encoding', '')):
+            patch_vary_headers(response, ('Accept-Encoding',))
+            compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+            # A compressed body is a different representation of the same resource, see GZipMiddleware
+            etag = response.get('ETag')
+            if etag and etag.startswith('"'):
+                response.headers['ETag'] = 'W/' + etag
+            response.headers['Content-Encoding'] = 'br'
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,109 @@
+from functools import wraps
+import hashlib
+
+from asgiref.sync import iscoroutinefunction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from ecommerce_app.cache import aget_or_set_catalog_entry, get_or_set_catalog_entry
+from ecommerce_app.models.admin import Brand, Category, Product, ProductCard, ProductImage
+
+# Conditional Catalog Reads
+# * ETag & Last-Modified come from Max(updated_at) & Count() of the tables a response is built from, never from the body,
+#   so a 304 skips the queries, serialization & rendering of the view
+# * Count() catches hard deletes, which Max(updated_at) alone would miss
+# * The validators of a URL are cached on the catalog version, like the responses themselves, so a write bumping the
+#   version is visible on the next request & unchanged data is validated with one cache read
+# * `Cache-Control: private, no-cache` makes clients revalidate every time instead of guessing a freshness lifetime
+
+
+def _validators(request, aggregates):
+    # The full path carries the page, page size & search, Accept separates the JSON & browsable representations
+    parts = [request.get_full_path(), request.headers.get('Accept', '')]
+    last_modified = None
+    for aggregate in aggregates:
+        parts += [aggregate['last_updated'] and aggregate['last_updated'].isoformat(), aggregate['count']]
+        if aggregate['last_updated'] and (last_modified is None or aggregate['last_updated'] > last_modified):
+            last_modified = aggregate['last_updated']
+    etag = quote_etag(hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest())
+    return etag, last_modified and int(last_modified.timestamp())
+
+
+def catalog_validators(request, querysets):
+    """
+    (ETag, Last-Modified Timestamp) Of A Catalog Read Built From `querysets`
+    """
+    def compute():
+        return _validators(request, [
+            queryset.order_by().aggregate(last_updated=Max('updated_at'), count=Count('pk')) for queryset in querysets
+        ])
+    return get_or_set_catalog_entry(('validators', request.get_full_path(), request.headers.get('Accept', '')), compute)
+
+
+async def acatalog_validators(request, querysets):
+    """
+    catalog_validators() For Async Views
+    """
+    async def compute():
+        return _validators(request, [
+            await queryset.order_by().aaggregate(last_updated=Max('updated_at'), count=Count('pk')) for queryset in querysets
+        ])
+    return await aget_or_set_catalog_entry(('validators', request.get_full_path(), request.headers.get('Accept', '')), compute)
+
+
+def _finish(response, etag, last_modified):
+    if 200 <= response.status_code < 300 or response.status_code == 304:
+        response.headers.setdefault('ETag', etag)
+        if last_modified:
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_catalog_get(sources):
+    """
+    Answer A Catalog GET With 304 When The Client's Validators Still Match
+    * `sources(request, *args, **kwargs)` returns the querysets whose rows the response is built from
+    * Wraps sync & async views, use method_decorator() on DRF view methods
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                etag, last_modified = await acatalog_validators(request, sources(request, *args, **kwargs))
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(response, etag, last_modified)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag, last_modified = catalog_validators(request, sources(request, *args, **kwargs))
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _finish(response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+# Sources, every status is included so soft deletes change the validators too
+def brand_sources(request, pk=None):
+    return [Brand.objects.filter(pk=pk) if pk else Brand.objects.all()]
+
+
+def product_sources(request, pk=None):
+    if pk:
+        return [Product.objects.filter(pk=pk), ProductImage.objects.filter(product_id=pk)]
+    return [Product.objects.all(), ProductImage.objects.all()]
+
+
+def category_sources(request, pk=None):
+    # Categories are served with their whole active sub tree, products & images
+    return [Category.objects.all(), Product.objects.all(), ProductImage.objects.all()]
+
+
+def product_card_sources(request):
+    return [ProductCard.objects.all()]
@@ -0,0 +1,248 @@
+from functools import lru_cache
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Static & Media File Serving
+# * collectstatic writes content-hashed copies (CompressedManifestStaticFilesStorage) with .br & .gz siblings, hashed
+#   names never change content so they are served with a one year immutable Cache-Control
+# * Every response carries an ETag & Last-Modified from the file's stat, If-None-Match / If-Modified-Since answer 304
+# * A single `Range: bytes=...` is answered with 206 (If-Range honoured), unsatisfiable ranges with 416
+# * With FILE_SERVING_ACCEL the checks above still run here but the body is handed to the front server through
+#   X-Accel-Redirect (nginx) or X-Sendfile (Apache, lighttpd), Python never reads the file
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+COMPRESS_MIN_SIZE = 256
+# (Content-Encoding, file suffix), preferred first
+PRECOMPRESSED_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSIBLE_TYPES = re.compile(r'^(text/|application/(javascript|json|xml|manifest\+json)|image/svg\+xml)')
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest Storage That Also Writes Brotli & Gzip Siblings Of The Hashed Text Files
+    * Siblings are only kept when they save at least 5%, .br needs the optional `brotli` package
+    """
+
+    def post_process(self, *args, **kwargs):
+        yield from super().post_process(*args, **kwargs)
+        if not kwargs.get('dry_run'):
+            for hashed_name in set(self.hashed_files.values()):
+                self.compress(hashed_name)
+
+    def compress(self, name):
+        content_type, _ = mimetypes.guess_type(name)
+        if not content_type or not COMPRESSIBLE_TYPES.match(content_type):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            content = source.read()
+        if len(content) < COMPRESS_MIN_SIZE:
+            return
+        compressors = {'.gz': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli:
+            compressors['.br'] = lambda data: brotli.compress(data, quality=11)
+        for suffix, compress in compressors.items():
+            compressed = compress(content)
+            if len(compressed) < len(content) * 0.95:
+                with open(path + suffix, 'wb') as target:
+                    target.write(compressed)
+            elif os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+@lru_cache(maxsize=None)
+def hashed_static_names():
+    # Names written by collectstatic, loaded from the manifest once per process
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def accepted_encodings(header):
+    encodings = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if coding and params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            encodings.add(coding.strip().lower())
+    return encodings
+
+
+def parse_range(header, size):
+    """
+    Parse A Single Byte Range Into (start, end) Inclusive
+    * Returns None for a header to ignore (multiple ranges, bad syntax), raises ValueError when it cannot be satisfied
+    """
+    match = RANGE_PATTERN.match(header.replace(' ', ''))
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start:
+        if not end:
+            return None
+        # Suffix range, the last `end` bytes
+        if int(end) == 0 or size == 0:
+            raise ValueError
+        return max(size - int(end), 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError
+    return start, end
+
+
+def header_safe(value):
+    """
+    Whether `value` Goes Into A Header As Is, Latin-1 Without Line Breaks
+    """
+    try:
+        value.encode('latin-1')
+    except UnicodeEncodeError:
+        return False
+    return '\r' not in value and '\n' not in value
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            block = file.read(min(STREAM_BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def serve_file(request, path, document_root, location, cache_control, precompressed=False):
+    """
+    Serve `path` From `document_root` With Validators, Range Support & Optional Front Server Hand-Off
+    * `location` is the internal nginx location mapped to `document_root` for X-Accel-Redirect
+    * `precompressed` picks a .br/.gz sibling the client accepts
+    """
+    try:
+        full_path = safe_join(document_root, posixpath.normpath(path).lstrip('/'))
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('File not found')
+    if not os.path.isfile(full_path):
+        raise Http404('File not found')
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    headers = {'Cache-Control': cache_control, 'Accept-Ranges': 'bytes'}
+    accel = settings.FILE_SERVING_ACCEL
+    if accel == 'x-sendfile' and not header_safe(full_path):
+        # X-Sendfile carries the raw filesystem path, a name a header can't hold as Latin-1 is served from here
+        accel = None
+
+    # nginx picks the sibling itself (gzip_static / brotli_static on the internal location)
+    if precompressed and accel != 'x-accel-redirect' and content_type and COMPRESSIBLE_TYPES.match(content_type):
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            try:
+                sibling_stat = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            headers['Vary'] = 'Accept-Encoding'
+            if encoding in accepted:
+                full_path, stat = full_path + suffix, sibling_stat
+                headers['Content-Encoding'] = encoding
+                break
+
+    # Siblings have their own size & mtime, so every representation gets its own ETag
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers['ETag'] = etag
+    headers['Last-Modified'] = http_date(stat.st_mtime)
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        # Weak comparison, W/ prefixes are ignored
+        tags = parse_etags(if_none_match)
+        if tags == ['*'] or etag in [tag.removeprefix('W/') for tag in tags]:
+            return not_modified(headers)
+    else:
+        modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        if modified_since is not None and int(stat.st_mtime) <= modified_since:
+            return not_modified(headers)
+
+    if accel:
+        response = HttpResponse(content_type=content_type or 'application/octet-stream', headers=headers)
+        if accel == 'x-accel-redirect':
+            # A URI, so spaces, `?`, `#` & non ASCII names are percent encoded, nginx decodes them back to the file name
+            response['X-Accel-Redirect'] = location + quote(posixpath.normpath(path).lstrip('/'))
+        else:
+            response['X-Sendfile'] = full_path
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or if_range in (etag, headers['Last-Modified'])):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416, headers=headers)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(full_path, start, end - start + 1),
+            status=206,
+            content_type=content_type or 'application/octet-stream',
+            headers=headers,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+        return response
+
+    # FileResponse lets the WSGI server use its file wrapper (os.sendfile under gunicorn)
+    return FileResponse(open(full_path, 'rb'), content_type=content_type or 'application/octet-stream', headers=headers)
+
+
+def not_modified(headers):
+    response = HttpResponseNotModified()
+    for header in ('Cache-Control', 'ETag', 'Last-Modified', 'Vary'):
+        if header in headers:
+            response[header] = headers[header]
+    return response
+
+
+@require_safe
+def serve_static(request, path):
+    """
+    Serve Collected Static Files, Hashed Names Are Cached For A Year As Immutable
+    """
+    if path in hashed_static_names():
+        cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        cache_control = f'public, max-age={settings.STATIC_CACHE_MAX_AGE}'
+    return serve_file(request, path, settings.STATIC_ROOT, settings.FILE_SERVING_ACCEL_LOCATIONS['static'], cache_control, precompressed=True)
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve Uploaded Media, Revalidated With The ETag Once MEDIA_CACHE_MAX_AGE Passes
+    * Not immutable, image variants are regenerated under the same name
+    """
+    cache_control = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+    return serve_file(request, path, settings.MEDIA_ROOT, settings.FILE_SERVING_ACCEL_LOCATIONS['media'], cache_control)
@@ -0,0 +1,216 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import lru_cache
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from ecommerce_app.models.user import Cart, GuestCart
+from ecommerce_app.utils import STATUS_CHOICES
+
+# Anonymous carts live in a guest cart store instead of Cart rows, and are only written to Cart when the user logs in
+# A cart is a dict of product id -> line ({'id', 'quantity', 'created_at', 'updated_at'}), every write refreshes its TTL
+# add() reads, changes & writes the whole cart under a per cart lock, so concurrent adds never lose a quantity
+# Every worker & serverless instance has to see the same carts: the default store keeps them in GuestCart rows,
+# the cache store is only used with a shared cache (GUEST_CART_CACHE_BACKEND=redis or memcached)
+
+# How long a cart lock is held at most, should its holder die, & how long add() waits for it
+GUEST_CART_LOCK_TIMEOUT = 5
+GUEST_CART_LOCK_WAIT = 10
+
+
+class GuestCartBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = {'status': 'error', 'data': 'The cart is being updated, please try again shortly.'}
+    default_code = 'guest_cart_busy'
+    wait = 1  # Sent as Retry-After
+
+
+class BaseGuestCartStore:
+    def load(self, cart_id):
+        raise NotImplementedError
+
+    def save(self, cart_id, lines):
+        raise NotImplementedError
+
+    def clear(self, cart_id):
+        raise NotImplementedError
+
+    def locked(self, cart_id):
+        """
+        Context Manager Holding The Cart's Write Lock
+        """
+        raise NotImplementedError
+
+    def add(self, cart_id, product_id, quantity):
+        with self.locked(cart_id):
+            lines = self.load(cart_id)
+            now = timezone.now().isoformat()
+            line = lines.get(str(product_id))
+            if line:
+                line['quantity'] += quantity
+                line['updated_at'] = now
+            else:
+                lines[str(product_id)] = {'id': str(uuid.uuid4()), 'quantity': quantity, 'created_at': now, 'updated_at': now}
+            self.save(cart_id, lines)
+
+    def replace(self, cart_id, quantities):
+        """
+        Store A Whole Cart At Once, `quantities` Maps Product Ids To Quantities
+        """
+        now = timezone.now().isoformat()
+        lines = {
+            str(product_id): {'id': str(uuid.uuid4()), 'quantity': quantity, 'created_at': now, 'updated_at': now}
+            for product_id, quantity in quantities.items()
+        }
+        with self.locked(cart_id):
+            self.save(cart_id, lines)
+
+    def quantities(self, cart_id):
+        return {uuid.UUID(product_id): line['quantity'] for product_id, line in self.load(cart_id).items()}
+
+    def lines(self, cart_id):
+        """
+        The Cart As Unsaved Cart Instances, So Cart Serializers & Views Work The Same As For Stored Carts
+        """
+        return [
+            Cart(
+                id=uuid.UUID(line['id']),
+                session_id=cart_id,
+                product_id=uuid.UUID(product_id),
+                quantity=line['quantity'],
+                status=STATUS_CHOICES[1][0],
+                created_at=parse_datetime(line['created_at']),
+                updated_at=parse_datetime(line['updated_at']),
+            )
+            for product_id, line in self.load(cart_id).items()
+        ]
+
+
+class DatabaseGuestCartStore(BaseGuestCartStore):
+    """
+    Guest Carts In GuestCart Rows, The Default, Seen By Every Worker Whatever The Cache Backend
+    * A cart expires GUEST_CART_TTL seconds after its last change, `manage.py purge_guest_carts` deletes expired rows
+    * The lock is the cart's row, written first in a transaction: the row lock on PostgreSQL & MySQL, the database
+      write lock on SQLite, so the read that follows already sees the last writer's cart
+    """
+    def load(self, cart_id):
+        return GuestCart.objects.filter(pk=cart_id, expires_at__gt=timezone.now()).values_list('lines', flat=True).first() or {}
+
+    def save(self, cart_id, lines):
+        GuestCart.objects.update_or_create(
+            pk=cart_id, defaults={'lines': lines, 'expires_at': timezone.now() + timedelta(seconds=settings.GUEST_CART_TTL)},
+        )
+
+    def clear(self, cart_id):
+        GuestCart.objects.filter(pk=cart_id).delete()
+
+    @contextmanager
+    def locked(self, cart_id):
+        with transaction.atomic():
+            # An expired placeholder when the cart is new, load() reads it as empty
+            GuestCart.objects.bulk_create([GuestCart(id=cart_id, lines={}, expires_at=timezone.now())], ignore_conflicts=True)
+            GuestCart.objects.filter(pk=cart_id).update(updated_at=timezone.now())
+            yield
+
+    def purge(self, now=None):
+        """
+        Delete Expired Carts, Returns How Many Were Deleted
+        """
+        return GuestCart.objects.filter(expires_at__lte=now or timezone.now()).delete()[0]
+
+
+class CacheGuestCartStore(BaseGuestCartStore):
+    """
+    Guest Carts In A Shared Django Cache, memcached or redis
+    * Entries expire after the cache alias TIMEOUT, which is GUEST_CART_TTL
+    * The lock is a key taken with cache.add(), holding a token so only its holder releases it
+    * get_guest_cart_store() refuses a cache other workers can't see (locmem) or can't lock atomically (file) unless DEBUG is on
+    """
+    shared_caches = (BaseMemcachedCache, RedisCache)
+
+    @property
+    def cache(self):
+        return caches[settings.GUEST_CART_CACHE_ALIAS]
+
+    def key(self, cart_id):
+        return f'guest_cart:{cart_id}'
+
+    def load(self, cart_id):
+        return self.cache.get(self.key(cart_id)) or {}
+
+    def save(self, cart_id, lines):
+        self.cache.set(self.key(cart_id), lines)
+
+    def clear(self, cart_id):
+        self.cache.delete(self.key(cart_id))
+
+    @contextmanager
+    def locked(self, cart_id):
+        key, token = f'guest_cart_lock:{cart_id}', uuid.uuid4().hex
+        deadline = time.monotonic() + GUEST_CART_LOCK_WAIT
+        while not self.cache.add(key, token, timeout=GUEST_CART_LOCK_TIMEOUT):
+            if time.monotonic() > deadline:
+                raise GuestCartBusy()
+            time.sleep(0.005)
+        try:
+            yield
+        finally:
+            # Past GUEST_CART_LOCK_TIMEOUT the key may belong to the next holder, leave it to them
+            if self.cache.get(key) == token:
+                self.cache.delete(key)
+
+
+class InMemoryGuestCartStore(BaseGuestCartStore):
+    """
+    In Process Fake For Tests, Same TTL Behaviour Without Any Cache Backend
+    """
+    def __init__(self):
+        self.carts = {}
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+
+    def load(self, cart_id):
+        with self.lock:
+            expires_at, lines = self.carts.get(cart_id, (0, {}))
+            if expires_at < time.monotonic():
+                self.carts.pop(cart_id, None)
+                return {}
+            return {product_id: dict(line) for product_id, line in lines.items()}
+
+    def save(self, cart_id, lines):
+        with self.lock:
+            self.carts[cart_id] = (time.monotonic() + settings.GUEST_CART_TTL, lines)
+
+    def clear(self, cart_id):
+        with self.lock:
+            self.carts.pop(cart_id, None)
+
+    @contextmanager
+    def locked(self, cart_id):
+        # One lock for every cart, enough for tests
+        with self.write_lock:
+            yield
+
+
+@lru_cache(maxsize=None)
+def get_guest_cart_store():
+    store = import_string(settings.GUEST_CART_STORE)()
+    if isinstance(store, CacheGuestCartStore) and not isinstance(store.cache, store.shared_caches) and not settings.DEBUG:
+        raise ImproperlyConfigured(
+            'CacheGuestCartStore needs a shared cache (GUEST_CART_CACHE_BACKEND=redis or memcached), '
+            'with any other backend every worker would keep its own carts'
+        )
+    return store
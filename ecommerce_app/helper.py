@@ -1,14 +1,19 @@
 from django.contrib.auth.models import AnonymousUser
+from django.db import connections, router
+from django.utils import timezone
 
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import status
 from rest_framework.response import Response
 
+from collections import defaultdict
 from datetime import timedelta
 import uuid
 
 from ecommerce_app.utils import STATUS_CHOICES
+from ecommerce_app.models.admin import Category, Product, ProductImage
 from ecommerce_app.models.user import Cart
+from ecommerce_app.guest_cart import get_guest_cart_store
 
 def create_jwt_token_for_user(user, expiry_hours = None):
     """
@@ -24,51 +29,165 @@ def create_jwt_token_for_user(user, expiry_hours = None):
     }
 
 
+def attach_active_images(products):
+    """
+    Load The Active Images Of All Given Products In One Query And Attach Them As `active_images`
+    """
+    products = list(products)
+    images = list(active_images_for(products)) if products else []
+    return _attach_images(products, images)
+
+
+async def aattach_active_images(products):
+    """
+    attach_active_images() For Async Views
+    """
+    products = list(products)
+    images = [image async for image in active_images_for(products)] if products else []
+    return _attach_images(products, images)
+
+
+def active_images_for(products):
+    return ProductImage.objects.filter(product_id__in=[product.id for product in products], status=STATUS_CHOICES[1][0])
+
+
+def _attach_images(products, images):
+    images_by_product = defaultdict(list)
+    for image in images:
+        images_by_product[image.product_id].append(image)
+
+    for product in products:
+        product.active_images = images_by_product[product.id]
+    return products
+
+
+def build_category_tree(categories):
+    """
+    Load The Active Sub Tree, Products & Product Images Of The Given Categories In A Fixed Number Of Queries
+    * Attaches `active_children` & `active_products` so CategorySerializer doesn't query per node
+    """
+    categories = list(categories)
+    if not categories:
+        return categories
+
+    nodes, expanded = _expand_category_tree(categories, Category.objects.filter(status=STATUS_CHOICES[1][0]))
+    products = Product.objects.filter(category_id__in=expanded, status=STATUS_CHOICES[1][0])
+    _attach_category_products(nodes, attach_active_images(products))
+    return categories
+
+
+async def abuild_category_tree(categories):
+    """
+    build_category_tree() For Async Views, Same Queries Through The Async ORM
+    """
+    categories = list(categories)
+    if not categories:
+        return categories
+
+    active_categories = [category async for category in Category.objects.filter(status=STATUS_CHOICES[1][0])]
+    nodes, expanded = _expand_category_tree(categories, active_categories)
+    products = [product async for product in Product.objects.filter(category_id__in=expanded, status=STATUS_CHOICES[1][0])]
+    _attach_category_products(nodes, await aattach_active_images(products))
+    return categories
+
+
+def _expand_category_tree(categories, active_categories):
+    children_by_parent = defaultdict(list)
+    for category in active_categories:
+        children_by_parent[category.parent_id].append(category)
+
+    # Walk the hierarchy in memory, collecting every node below the requested categories
+    nodes = []
+    expanded = set()
+    pending = list(categories)
+    while pending:
+        category = pending.pop()
+        category.active_children = children_by_parent[category.id]
+        nodes.append(category)
+        if category.id not in expanded:
+            expanded.add(category.id)
+            pending.extend(category.active_children)
+    return nodes, expanded
+
+
+def _attach_category_products(nodes, products):
+    products_by_category = defaultdict(list)
+    for product in products:
+        products_by_category[product.category_id].append(product)
+
+    for category in nodes:
+        category.active_products = products_by_category[category.id]
+
+
+UPSERT_BATCH_SIZE = 500
+
+def upsert_cart_lines(quantities, user_id):
+    """
+    Add Quantities To The User's Active Cart Lines With One INSERT ... ON CONFLICT DO UPDATE Per Batch
+    * `quantities` maps product ids to the quantity to add, missing lines are created
+    * The conflict target is the partial unique index on (user, product) for active rows
+    """
+    connection = connections[router.db_for_write(Cart)]
+    fields = {field.attname: field for field in Cart._meta.concrete_fields}
+    columns = ['id', 'user_id', 'product_id', 'quantity', 'status', 'created_at', 'updated_at']
+    quote = connection.ops.quote_name
+    table = quote(Cart._meta.db_table)
+    now = timezone.now()
+
+    # The predicate is inlined, SQLite only matches a partial index against the same literal expression
+    sql = (
+        f"INSERT INTO {table} ({', '.join(quote(column) for column in columns)}) VALUES {{values}} "
+        f"ON CONFLICT ({quote('user_id')}, {quote('product_id')}) WHERE {quote('status')} = {int(STATUS_CHOICES[1][0])} "
+        f"DO UPDATE SET {quote('quantity')} = {table}.{quote('quantity')} + excluded.{quote('quantity')}, "
+        f"{quote('updated_at')} = excluded.{quote('updated_at')}"
+    )
+    lines = list(quantities.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(lines), UPSERT_BATCH_SIZE):
+            batch = lines[start:start + UPSERT_BATCH_SIZE]
+            params = []
+            for product_id, quantity in batch:
+                values = [uuid.uuid4(), user_id, product_id, quantity, STATUS_CHOICES[1][0], now, now]
+                params.extend(fields[column].get_db_prep_save(value, connection) for column, value in zip(columns, values))
+            placeholders = ', '.join(['(%s)' % ', '.join(['%s'] * len(columns))] * len(batch))
+            cursor.execute(sql.format(values=placeholders), params)
+
+
 # For Cart CRUD operations
+# Anonymous carts live in the guest cart store (see ecommerce_app/guest_cart.py), keyed by the session's cart_id
 class CartMixin:
+    def get_guest_cart_id(self, request, create=False):
+        cart_id = request.session.get('cart_id')
+        if not cart_id and create:
+            cart_id = str(uuid.uuid4())
+            request.session['cart_id'] = cart_id
+        return cart_id
+
     def get_cart(self, request):
         if isinstance(request.user, AnonymousUser):
-            cart_id = request.session.get('cart_id')
-            if not cart_id:
-                cart_id = str(uuid.uuid4())
-                request.session['cart_id'] = cart_id
-            return Cart.objects.filter(session_id = cart_id, status = STATUS_CHOICES[1][0])
+            cart_id = self.get_guest_cart_id(request, create=True)
+            return get_guest_cart_store().lines(cart_id)
         else:
             return request.user.cart_user.filter(status = STATUS_CHOICES[1][0])
 
     def add_to_cart(self, request, product_id, quantity):
+        """
+        Add The Quantity To The Product's Cart Line, Creating The Line If Needed
+        * Anonymous carts are updated in the guest cart store, user carts with one atomic upsert
+        """
         if isinstance(request.user, AnonymousUser):
-            cart_id = request.session.get('cart_id')
-            if cart_id:
-                cart_item = Cart.objects.filter(session_id = cart_id, product__id = product_id, status = STATUS_CHOICES[1][0]).first()
-                if cart_item:
-                    cart_item.quantity += quantity
-                    cart_item.save()
-                else:
-                    Cart.objects.create(session_id = cart_id, product_id = product_id, quantity = quantity)
-            else:
-                cart_id = uuid.uuid4()
-                request.session['cart_id'] = str(cart_id)
-                Cart.objects.create(session_id = cart_id, product_id = product_id, quantity = 1)
-            
+            cart_id = self.get_guest_cart_id(request, create=True)
+            get_guest_cart_store().add(cart_id, product_id, quantity)
         else:
-            cart_item = request.user.cart_user.filter(product_id=product_id).first()
-            if not cart_item:
-                cart_item = Cart()
-                cart_item.user = request.user
-                cart_item.product_id = product_id
-                cart_item.quantity = quantity
-            else:
-                cart_item.quantity += quantity
-            cart_item.save()
+            upsert_cart_lines({product_id: quantity}, user_id=request.user.id)
         return
     
     def search_product_in_cart(self, request, product_id):
         if isinstance(request.user, AnonymousUser):
-            cart_id = request.session.get('cart_id')
+            cart_id = self.get_guest_cart_id(request)
             if cart_id:
-                # Searching for the product in the anonymous user's session-based cart
-                cart_item = Cart.objects.filter(session_id=cart_id, product_id=product_id, status=STATUS_CHOICES[1][0]).first()
+                # Searching for the product in the anonymous user's guest cart
+                cart_item = next((item for item in get_guest_cart_store().lines(cart_id) if str(item.product_id) == str(product_id)), None)
             else:
                 cart_item = None
         else:
@@ -0,0 +1,119 @@
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from ecommerce_app.cache import bump_catalog_version
+from ecommerce_app.workers import BoundedProcessPool, WorkerPoolBusy
+
+# Product Image Variants
+# * Every product image gets resized copies (IMAGE_VARIANTS), each as WebP plus JPEG (PNG when the original has transparency)
+# * Generated by Pillow in a bounded process pool (see ecommerce_app/workers.py), never in the request thread:
+#   saving an image queues it once the transaction commits, images the pool turns away or bulk inserts skipped are
+#   picked up by the generate_image_variants command
+# * ProductImage.variants maps the variant name to its width, height & the storage names of both encodings
+
+logger = logging.getLogger(__name__)
+
+# name: bounding box, the aspect ratio is kept & images are never enlarged
+IMAGE_VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'zoom': (1600, 1600),
+}
+VARIANTS_DIR = 'product_images/variants'
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+
+@lru_cache(maxsize=None)
+def get_image_pool():
+    return BoundedProcessPool(
+        max_workers=settings.IMAGE_VARIANT_WORKERS,
+        max_pending=settings.IMAGE_VARIANT_MAX_PENDING,
+        nice=settings.IMAGE_VARIANT_NICE,
+    )
+
+
+def generate_variants(image_id, image_name):
+    """
+    Resize One Stored Image Into Every Variant & Save Them, Returns The `variants` Map, Runs In A Pool Process
+    """
+    largest = max(IMAGE_VARIANTS.values())
+    with default_storage.open(image_name) as source, Image.open(source) as original:
+        # Let the JPEG decoder downscale while decoding, a fraction of the work for big photos
+        original.draft('RGB', largest)
+        image = ImageOps.exif_transpose(original)
+        transparent = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if transparent else 'RGB')
+
+    fallback_format, extension, options = ('PNG', 'png', {'optimize': True}) if transparent else ('JPEG', 'jpg', {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True})
+    variants = {}
+    for name, size in IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        variants[name] = {
+            'width': resized.width,
+            'height': resized.height,
+            'src': save_variant(resized, f'{VARIANTS_DIR}/{image_id}-{name}.{extension}', fallback_format, **options),
+            'webp': save_variant(resized, f'{VARIANTS_DIR}/{image_id}-{name}.webp', 'WEBP', quality=WEBP_QUALITY, method=4),
+        }
+    return variants
+
+
+def save_variant(image, name, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    # Regenerating replaces the previous file instead of saving next to it under a new name
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def queue_variants(image_id, image_name):
+    """
+    Generate The Variants Of An Image In The Background, Returns False When The Pool Is Busy Or Broken
+    * Runs after the upload committed, so nothing is raised, the image is left to generate_image_variants
+    """
+    try:
+        future = get_image_pool().submit(generate_variants, image_id, image_name)
+    except WorkerPoolBusy:
+        return False
+    except BrokenProcessPool:
+        # The pool discarded itself, the next upload starts a fresh one
+        logger.warning('Image variants of %s not queued, the worker pool broke', image_id, exc_info=True)
+        return False
+    future.add_done_callback(lambda future: _store_variants(image_id, future))
+    return True
+
+
+def _store_variants(image_id, future):
+    # Runs in the pool's result thread
+    from ecommerce_app.models.admin import ProductImage
+    from ecommerce_app.product_cards import refresh_cards
+
+    if future.cancelled() or future.exception():
+        logger.warning('Image variants of %s failed: %r', image_id, future.exception() if not future.cancelled() else 'cancelled')
+        return
+    try:
+        # update() skips the post_save signal, which would queue the image again, so the card is refreshed here,
+        # and auto_now, so updated_at is set for conditional GETs
+        ProductImage.objects.filter(pk=image_id).update(variants=future.result(), updated_at=timezone.now())
+        refresh_cards(ProductImage.objects.filter(pk=image_id).values_list('product_id', flat=True))
+        bump_catalog_version()
+    finally:
+        connections.close_all()
+
+
+def variant_urls(variants, storage=default_storage):
+    return {
+        name: {'width': variant['width'], 'height': variant['height'], 'src': storage.url(variant['src']), 'webp': storage.url(variant['webp'])}
+        for name, variant in (variants or {}).items()
+    }
@@ -0,0 +1,62 @@
+import io
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from ecommerce_app.benchmark import ACTIVE, summarize_latencies
+from ecommerce_app.helper import attach_active_images
+from ecommerce_app.models.admin import Product
+from ecommerce_app.renderers import FastJSONParser, FastJSONRenderer, orjson
+from ecommerce_app.serializers.admin import ProductSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Time DRF's stock JSON renderer & parser against the orjson backed ones on one page of products, "
+        'both as the product list serializes it and as raw rows (UUID, Decimal & datetime values)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100, help='Products on the page')
+        parser.add_argument('--rounds', type=int, default=2000, help='Timed renders & parses of each payload')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson is not installed, FastJSONRenderer would only time the stock renderer')
+        products = list(Product.objects.filter(status=ACTIVE).order_by('-created_at', '-id')[:options['page_size']])
+        if not products:
+            raise CommandError('No products, run seed_benchmark_data first')
+
+        payloads = {
+            'serialized': {
+                'count': len(products), 'next': None, 'previous': None,
+                'results': {'status': 'success', 'data': ProductSerializer(attach_active_images(products), many=True).data},
+            },
+            'raw_rows': list(Product.objects.filter(pk__in=[product.pk for product in products]).values()),
+        }
+        for name, payload in payloads.items():
+            stock, fast = JSONRenderer().render(payload), FastJSONRenderer().render(payload)
+            if json.loads(stock) != json.loads(fast):
+                raise CommandError(f'{name}: the renderers disagree')
+
+            self.stdout.write(f'{name} ({len(stock)} bytes):')
+            render = {label: self.time(lambda: renderer.render(payload), options['rounds'])
+                      for label, renderer in (('stock', JSONRenderer()), ('fast', FastJSONRenderer()))}
+            parse = {label: self.time(lambda: parser.parse(io.BytesIO(stock)), options['rounds'])
+                     for label, parser in (('stock', JSONParser()), ('fast', FastJSONParser()))}
+            for action, results in (('render', render), ('parse', parse)):
+                for label, summary in results.items():
+                    self.stdout.write(f"  {action:6} {label:5} p50 {summary['p50_ms']:.3f}ms  p99 {summary['p99_ms']:.3f}ms")
+                self.stdout.write(f"  {action:6} speedup x{results['stock']['p50_ms'] / results['fast']['p50_ms']:.1f}")
+
+    def time(self, call, rounds):
+        call()
+        latencies = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - started)
+        return summarize_latencies(latencies)
@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ecommerce_app.models.admin import Brand, Category, Product, ProductCard, ProductImage
+from ecommerce_app.models.user import User, Cart, ProductPurchase, StockReservation
+from ecommerce_app.benchmark import ACTIVE, seed_dataset
+from ecommerce_app.product_cards import refresh_queryset
+from ecommerce_app.order_export import export_queryset
+from ecommerce_app.utils import RESERVATION_STATUS
+
+PAGE = 10
+
+
+# The main query of each endpoint, built the same way as in the views, from a sample of existing ids
+QUERY_PLANS = {
+    'product_list': lambda s: Product.objects.filter(status=ACTIVE).order_by('-created_at', '-id')[:PAGE],
+    'product_detail': lambda s: Product.objects.filter(pk=s['product'], status=ACTIVE),
+    'product_cards': lambda s: ProductCard.objects.order_by('-created_at', '-id')[:PAGE],
+    'product_cards_category': lambda s: ProductCard.objects.filter(category_id=s['category']).order_by('-created_at', '-id')[:PAGE],
+    'product_cards_brand_rename': lambda s: ProductCard.objects.filter(brand_id=s['brand']),
+    'product_images': lambda s: ProductImage.objects.filter(product_id__in=s['products'], status=ACTIVE),
+    'brand_list': lambda s: Brand.objects.filter(status=ACTIVE).order_by('-created_at', '-id')[:PAGE],
+    'category_list': lambda s: Category.objects.filter(status=ACTIVE).order_by('-created_at', '-id')[:PAGE],
+    'category_children': lambda s: Category.objects.filter(parent_id=s['category'], status=ACTIVE),
+    'category_products': lambda s: Product.objects.filter(category_id__in=s['categories'], status=ACTIVE),
+    'user_list': lambda s: User.objects.filter(status=ACTIVE).order_by('-created_at')[:PAGE],
+    'user_login': lambda s: User.objects.filter(email=s['email'])[:1],
+    'cart_list': lambda s: Cart.objects.filter(user_id=s['user'], status=ACTIVE),
+    'cart_search': lambda s: Cart.objects.filter(user_id=s['user'], product_id=s['product'], status=ACTIVE)[:1],
+    'cart_stock_check': lambda s: Cart.objects.filter(user_id=s['user'], status=ACTIVE, quantity__gt=F('product__stock')).values('product_id', 'quantity'),
+    'purchase_list': lambda s: ProductPurchase.objects.filter(user_id=s['user'], status=ACTIVE),
+    'order_export': lambda s: export_queryset(created_from=timezone.now() - timedelta(days=1))[:PAGE],
+    'expired_holds': lambda s: StockReservation.objects.filter(reservation_status=RESERVATION_STATUS[0][0], expires_at__lte=timezone.now()),
+}
+
+
+# Queries allowed to scan an index: unfiltered pages read in index order & cut off by LIMIT, so walking the
+# ORDER BY index stops after the page
+BOUNDED_SCANS = {'product_cards'}
+
+
+def full_scans(plan, vendor, bounded=False):
+    """
+    Plan Lines Reading A Whole Table Or A Whole Index
+    * SQLite: every `SCAN <table>`, `SCAN <table> USING [COVERING] INDEX` included, only `SEARCH` lines use an index to
+      find rows, PostgreSQL: `Seq Scan on <table>`
+    * `bounded` queries may scan an index, their LIMIT stops the scan after the page
+    """
+    lines = plan.splitlines()
+    if vendor == 'sqlite':
+        scans = [line for line in lines if ' SCAN ' in f' {line} ']
+        return [line for line in scans if ' USING ' not in line] if bounded else scans
+    if vendor == 'postgresql':
+        return [line.strip() for line in lines if 'Seq Scan on' in line]
+    raise CommandError(f'Query plan checks are not supported on {vendor}')
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN the main query of every endpoint and fail when any of them reads a whole table. '
+        'With --seed, a large dataset is inserted first and rolled back at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Products to insert before explaining, users, carts etc. scale with it')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only failing ones')
+
+    def handle(self, *args, **options):
+        failures = {}
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'])
+            sample = self.sample()
+
+            for name, build in QUERY_PLANS.items():
+                plan = build(sample).explain()
+                scans = full_scans(plan, connection.vendor, bounded=name in BOUNDED_SCANS)
+                if scans:
+                    failures[name] = scans
+                if scans or options['verbose_plans']:
+                    self.stdout.write(f'{name}:\n  ' + '\n  '.join(plan.splitlines()))
+                self.stdout.write(self.style.ERROR(f'FULL SCAN {name}') if scans else self.style.SUCCESS(f'ok {name}'))
+
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"{len(failures)} queries read a whole table: {', '.join(failures)}")
+
+    def sample(self):
+        product = Product.objects.filter(status=ACTIVE).first()
+        category = Category.objects.filter(status=ACTIVE).first()
+        user = User.objects.filter(status=ACTIVE).first()
+        if not (product and category and user):
+            raise CommandError('No active product, category or user to explain with, run with --seed')
+
+        return {
+            'product': product.id,
+            'products': list(Product.objects.filter(status=ACTIVE).values_list('id', flat=True)[:PAGE]),
+            'category': category.id,
+            'brand': Brand.objects.values_list('id', flat=True).first(),
+            'categories': list(Category.objects.filter(status=ACTIVE).values_list('id', flat=True)[:PAGE]),
+            'user': user.id,
+            'email': user.email,
+        }
+
+    def seed(self, products):
+        """
+        The Benchmark Dataset At The Given Size, Analyzed So The Planner Sees Its Real Size
+        """
+        seed_dataset(products=products, users=max(products // 5, 1), cart_users=max(products // 100, 1),
+                     guest_carts=max(products // 100, 1), cart_lines=20)
+        refresh_queryset(Product.objects.order_by())
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(f'Seeded {products} products')
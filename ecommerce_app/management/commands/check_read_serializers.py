@@ -0,0 +1,93 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from ecommerce_app.benchmark import ACTIVE, summarize_latencies
+from ecommerce_app.guest_cart import get_guest_cart_store
+from ecommerce_app.helper import attach_active_images
+from ecommerce_app.models.admin import Product, ProductCard
+from ecommerce_app.models.user import Cart, User
+from ecommerce_app.serializers.admin import ProductCardSerializer, ProductSerializer
+from ecommerce_app.serializers.read import CartReadSerializer, ProductCardReadSerializer, ProductReadSerializer, UserReadSerializer
+from ecommerce_app.serializers.user import CartSerializer, UserSerializer
+
+
+# Each case: DRF serializer class, read serializer class, rows -> model instances as the DRF serializer gets them
+CASES = {
+    'product_list': (ProductSerializer, ProductReadSerializer, attach_active_images),
+    'product_card_list': (ProductCardSerializer, ProductCardReadSerializer, list),
+    'user_list': (UserSerializer, UserReadSerializer, list),
+    'cart_list': (CartSerializer, CartReadSerializer, list),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Check that the read serializers render byte for byte what the DRF serializers they stand in for render, '
+        'on pages of real rows, and time both per 100 rows. Fails on any difference.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=5, help='Pages of 100 rows checked per endpoint')
+        parser.add_argument('--rounds', type=int, default=200, help='Timed serializations of one page, 0 to only check')
+
+    def handle(self, *args, **options):
+        querysets = {
+            'product_list': Product.objects.filter(status=ACTIVE).order_by('-created_at', '-id'),
+            'product_card_list': ProductCard.objects.order_by('-created_at', '-id'),
+            'user_list': User.objects.filter(status=ACTIVE).order_by('-created_at', '-id'),
+            'cart_list': Cart.objects.filter(status=ACTIVE).order_by('-created_at', '-id'),
+        }
+        failures = []
+        for name, (serializer_class, read_serializer_class, instances) in CASES.items():
+            queryset = querysets[name]
+            pages = [queryset[offset:offset + 100] for offset in range(0, options['pages'] * 100, 100)]
+            checked = 0
+            for page in pages:
+                expected = JSONRenderer().render(serializer_class(instances(page), many=True).data)
+                actual = JSONRenderer().render(read_serializer_class().serialize(page))
+                if expected != actual:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'MISMATCH {name}\n  drf:  {expected[:500]}\n  read: {actual[:500]}'))
+                    break
+                checked += len(page)
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok {name} ({checked} objects)'))
+
+            if options['rounds'] and name not in failures and checked:
+                page = pages[0]
+                drf = self.time(lambda: serializer_class(instances(page._chain()), many=True).data, options['rounds'])
+                read = self.time(lambda: read_serializer_class().serialize(page._chain()), options['rounds'])
+                self.stdout.write(
+                    f"  per 100 rows, query included: drf p50 {drf['p50_ms']:.2f}ms, read p50 {read['p50_ms']:.2f}ms, "
+                    f"x{drf['p50_ms'] / read['p50_ms']:.1f}"
+                )
+
+        # Guest carts are served from the guest cart store as unsaved Cart instances
+        store = get_guest_cart_store()
+        cart_id = 'check-read-serializers'
+        products = list(Product.objects.filter(status=ACTIVE).values_list('id', flat=True)[:20])
+        try:
+            for product_id in products:
+                store.add(cart_id, product_id, 2)
+            lines = store.lines(cart_id)
+            if JSONRenderer().render(CartSerializer(lines, many=True).data) != JSONRenderer().render(CartReadSerializer().serialize(lines)):
+                failures.append('guest_cart_list')
+                self.stdout.write(self.style.ERROR('MISMATCH guest_cart_list'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok guest_cart_list ({len(lines)} objects)'))
+        finally:
+            store.clear(cart_id)
+
+        if failures:
+            raise CommandError(f"The read serializers differ from the DRF ones: {', '.join(failures)}")
+
+    def time(self, call, rounds):
+        call()
+        latencies = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - started)
+        return summarize_latencies(latencies)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce_app.reservations import expire_stale_holds
+
+
+class Command(BaseCommand):
+    help = 'Return the stock of unpaid holds past their expiry, run it every minute or so from cron'
+
+    def handle(self, *args, **options):
+        expired = expire_stale_holds()
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} stock holds'))
@@ -0,0 +1,79 @@
+from concurrent.futures import FIRST_COMPLETED, wait
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ecommerce_app.cache import bump_catalog_version
+from ecommerce_app.images import generate_variants
+from ecommerce_app.models.admin import ProductImage
+from ecommerce_app.product_cards import refresh_cards
+from ecommerce_app.utils import STATUS_CHOICES
+from ecommerce_app.workers import BoundedProcessPool, WorkerPoolBusy
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate the resized & WebP variants of active product images in parallel, by default only images without '
+        'variants (bulk imports, images the upload pool turned away)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate images that already have variants')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Pool processes')
+        parser.add_argument('--nice', type=int, default=10, help='Niceness of the pool processes')
+        parser.add_argument('--limit', type=int, help='Process at most this many images')
+        parser.add_argument('--batch-size', type=int, default=500, help='Variants saved per UPDATE batch')
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.filter(status=STATUS_CHOICES[1][0]).order_by()
+        if not options['all']:
+            images = images.filter(variants={})
+        images = images.values_list('id', 'image')
+        if options['limit']:
+            images = images[:options['limit']]
+
+        # A few calls queued per process keeps every process busy while results are saved
+        pool = BoundedProcessPool(max_workers=options['workers'], max_pending=options['workers'] * 2, nice=options['nice'])
+        self.pending = {}
+        self.done = []
+        self.counts = {'generated': 0, 'failed': 0}
+        started = time.perf_counter()
+        try:
+            for image_id, image_name in images.iterator(chunk_size=1000):
+                while True:
+                    try:
+                        self.pending[pool.submit(generate_variants, image_id, image_name)] = (image_id, image_name)
+                        break
+                    except WorkerPoolBusy:
+                        if not self.pending:
+                            time.sleep(0.01)  # The finished call's slot is freed right after its result is set
+                        self.collect(wait(self.pending, return_when=FIRST_COMPLETED).done, options['batch_size'])
+            self.collect(wait(self.pending).done, 0)
+        finally:
+            pool.shutdown()
+            if self.counts['generated']:
+                bump_catalog_version()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated variants of {self.counts['generated']} images in {elapsed:.1f}s "
+            f"({self.counts['generated'] / elapsed if elapsed else 0:.1f}/s), {self.counts['failed']} failed"
+        ))
+
+    def collect(self, finished, batch_size):
+        for future in finished:
+            image_id, image_name = self.pending.pop(future)
+            try:
+                self.done.append(ProductImage(id=image_id, variants=future.result(), updated_at=timezone.now()))
+            except Exception as exc:
+                self.counts['failed'] += 1
+                self.stderr.write(f'{image_id} {image_name}: {exc!r}')
+        if len(self.done) >= batch_size:
+            # bulk_update skips auto_now, updated_at is saved explicitly so conditional GETs see the variants
+            ProductImage.objects.bulk_update(self.done, ['variants', 'updated_at'])
+            # bulk_update skips signals, the cards showing these images are refreshed here
+            refresh_cards(ProductImage.objects.filter(id__in=[image.id for image in self.done]).values_list('product_id', flat=True).distinct())
+            self.counts['generated'] += len(self.done)
+            self.done = []
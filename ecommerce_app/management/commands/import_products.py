@@ -0,0 +1,34 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce_app.product_import import IMPORT_BATCH_SIZE, IMPORT_FORMATS, import_format, import_report
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import products from a CSV or NDJSON file (- for stdin), brands & categories by name. '
+        'Rejected rows are reported as NDJSON lines, followed by a summary'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, - reads stdin')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Products inserted per chunk')
+        parser.add_argument('--report', help='Write the report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or import_format(options['path'])
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError('Unknown format, pass --format')
+
+        source = sys.stdin.buffer if options['path'] == '-' else open(options['path'], 'rb')
+        report = open(options['report'], 'w') if options['report'] else self.stdout
+        try:
+            for line in import_report(source, file_format, batch_size=options['batch_size']):
+                report.write(line)
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+            if report is not self.stdout:
+                report.close()
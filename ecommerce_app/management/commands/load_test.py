@@ -0,0 +1,185 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce_app.benchmark import summarize_latencies
+from ecommerce_app.helper import create_jwt_token_for_user
+from ecommerce_app.models.user import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive a running server with concurrent keep-alive clients and report requests/sec & latency percentiles, '
+        'e.g. the same paths against `gunicorn ecommerce.wsgi` and `uvicorn ecommerce.asgi:application`, '
+        'optionally while background clients keep POSTing to another path (a login storm)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the running server')
+        parser.add_argument('--path', action='append', dest='paths', help='Path to request, repeat to rotate through several')
+        parser.add_argument('--clients', type=int, default=500, help='Concurrent clients, each on its own connection')
+        parser.add_argument('--requests', type=int, default=5000, help='Total requests across all clients')
+        parser.add_argument('--email', help='Send a bearer token for this user')
+        parser.add_argument('--timeout', type=float, default=60, help='Per request timeout in seconds')
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+        parser.add_argument('--storm-path', help='Path background clients POST to for the whole run, e.g. /login/')
+        parser.add_argument('--storm-body', default='{}', help='JSON body of the background POSTs')
+        parser.add_argument('--storm-clients', type=int, default=0, help='Background clients, on top of --clients')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError('Only plain http:// targets are supported')
+
+        headers = {'Host': url.netloc, 'Connection': 'keep-alive'}
+        if options['email']:
+            user = User.objects.filter(email=options['email']).first()
+            if not user:
+                raise CommandError(f"No user with email {options['email']}")
+            headers['Authorization'] = f"Bearer {create_jwt_token_for_user(user)['access_token']}"
+
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.timeout = options['timeout']
+        self.paths = options['paths'] or ['/products/']
+        self.head = ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+        self.storm_path = options['storm_path']
+        self.storm_body = options['storm_body'].encode()
+
+        summary = asyncio.run(self.run(options['clients'], options['requests'], options['storm_clients']))
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+
+        self.write_summary(summary)
+        if 'storm' in summary:
+            self.stdout.write(f'background POST {self.storm_path}:')
+            self.write_summary(summary['storm'])
+
+    def write_summary(self, summary):
+        self.stdout.write(
+            f"{summary['requests']} requests, {summary['clients']} clients, {summary['errors']} errors "
+            f"in {summary['seconds']:.2f}s -> {summary['requests_per_second']:.1f} req/s"
+        )
+        self.stdout.write(
+            f"latency ms: p50 {summary['p50_ms']:.1f}  p95 {summary['p95_ms']:.1f}  "
+            f"p99 {summary['p99_ms']:.1f}  max {summary['max_ms']:.1f}"
+        )
+        self.stdout.write(f"status codes: {summary['status_codes']}")
+
+    async def run(self, clients, total, storm_clients=0):
+        remaining = iter(range(total))
+        stats = self.new_stats()
+        storm_stats = self.new_stats()
+        running = True
+
+        async def client():
+            connection = None
+            for index in remaining:
+                connection = await self.timed(stats, connection, self.paths[index % len(self.paths)])
+            self.close(connection)
+
+        async def storm_client():
+            connection = None
+            while running:
+                connection = await self.timed(storm_stats, connection, self.storm_path, self.storm_body)
+            self.close(connection)
+
+        storm = [asyncio.ensure_future(storm_client()) for _ in range(storm_clients if self.storm_path else 0)]
+        if storm:
+            await asyncio.sleep(1)  # Let the storm build up first
+
+        started = time.perf_counter()
+        await asyncio.gather(*[client() for _ in range(clients)])
+        elapsed = time.perf_counter() - started
+
+        running = False
+        await asyncio.gather(*storm)
+
+        summary = self.summarize(stats, elapsed, clients)
+        if storm:
+            summary['storm'] = self.summarize(storm_stats, elapsed, len(storm))
+        return summary
+
+    def new_stats(self):
+        return {'latencies': [], 'status_codes': {}, 'errors': 0}
+
+    async def timed(self, stats, connection, path, body=None):
+        """
+        One Request On The Client's Connection, Recorded In `stats`, Returns The Connection To Reuse (None When Closed)
+        """
+        started = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+            status_code, keep_alive, retry_after = await asyncio.wait_for(self.fetch(connection, path, body), self.timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            stats['errors'] += 1
+            return self.close(connection)
+
+        stats['latencies'].append(time.perf_counter() - started)
+        stats['status_codes'][status_code] = stats['status_codes'].get(status_code, 0) + 1
+        if retry_after:
+            # Back off like a well behaved client
+            await asyncio.sleep(retry_after)
+        return connection if keep_alive else self.close(connection)
+
+    def summarize(self, stats, elapsed, clients):
+        latencies = stats['latencies']
+        return {
+            'requests': len(latencies) + stats['errors'],
+            'clients': clients,
+            'errors': stats['errors'],
+            'seconds': elapsed,
+            'requests_per_second': len(latencies) / elapsed if elapsed else 0.0,
+            **summarize_latencies(latencies),
+            'status_codes': stats['status_codes'],
+        }
+
+    async def fetch(self, connection, path, body=None):
+        reader, writer = connection
+        if body is None:
+            writer.write(f'GET {path} HTTP/1.1\r\n{self.head}\r\n'.encode('latin-1'))
+        else:
+            writer.write(
+                f'POST {path} HTTP/1.1\r\n{self.head}Content-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body
+            )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b'', None)
+        status_code = int(status_line.split()[1])
+
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip().lower()
+
+        if 'content-length' in response_headers:
+            await reader.readexactly(int(response_headers['content-length']))
+        elif response_headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await reader.read()
+            return status_code, False, None
+
+        retry_after = response_headers.get('retry-after')
+        retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+        return status_code, response_headers.get('connection') != 'close', retry_after
+
+    def close(self, connection):
+        if connection is not None:
+            connection[1].close()
+        return None
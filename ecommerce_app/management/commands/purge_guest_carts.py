@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce_app.guest_cart import DatabaseGuestCartStore, get_guest_cart_store
+
+
+class Command(BaseCommand):
+    help = 'Delete guest carts past their expiry from the database guest cart store, run it daily from cron'
+
+    def handle(self, *args, **options):
+        store = get_guest_cart_store()
+        if not isinstance(store, DatabaseGuestCartStore):
+            self.stdout.write(f'{type(store).__name__} expires carts by itself, nothing to purge')
+            return
+        purged = store.purge()
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} expired guest carts'))
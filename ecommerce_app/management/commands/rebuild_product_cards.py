@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ecommerce_app import product_cards
+from ecommerce_app.cache import bump_catalog_version
+from ecommerce_app.models.admin import Product, ProductCard
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the storefront card of every product, e.g. after bulk inserts or updates that skipped signals'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        # Cards whose product is gone, refresh_queryset() only visits existing products
+        ProductCard.objects.exclude(id__in=Product.objects.values('id')).delete()
+        product_cards.refresh_queryset(Product.objects.order_by())
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {ProductCard.objects.count()} product cards in {time.perf_counter() - started:.1f}s'
+        ))
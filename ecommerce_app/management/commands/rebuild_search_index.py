@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce_app import search
+
+
+class Command(BaseCommand):
+    help = 'Create the search tables and reindex every product, brand and category'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=list(search.SEARCH_INDEXES), help='Only rebuild one object type')
+
+    def handle(self, *args, **options):
+        search.create_search_indexes()
+        object_types = [options['type']] if options['type'] else list(search.SEARCH_INDEXES)
+        for object_type in object_types:
+            model = search.SEARCH_INDEXES[object_type]['model']
+            search.index_queryset(object_type, model.objects.all())
+            self.stdout.write(self.style.SUCCESS(f'Reindexed {object_type}'))
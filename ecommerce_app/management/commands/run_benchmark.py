@@ -0,0 +1,204 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from importlib import import_module
+import json
+import random
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from ecommerce_app.benchmark import (
+    BENCH_ADMIN_EMAIL, REQUESTS, TRAFFIC_MIXES, TrafficContext, clear_run, summarize_latencies,
+)
+from ecommerce_app.helper import create_jwt_token_for_user
+from ecommerce_app.models.admin import Category, Product
+from ecommerce_app.models.user import Cart, User
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a weighted traffic mix against every endpoint in-process (no server, no network) on the dataset from '
+        'seed_benchmark_data and report p50/p95/p99, requests/sec & queries per request, per endpoint. '
+        'Save runs with --output and diff two commits with --compare'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mix', choices=list(TRAFFIC_MIXES), default='storefront', help='Traffic mix to replay')
+        parser.add_argument('--requests', type=int, default=2000, help='Measured requests')
+        parser.add_argument('--warmup', type=int, default=200, help='Requests run first & not measured')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, the same seed replays the same requests')
+        parser.add_argument('--sample-size', type=int, default=2000, help='Ids sampled from the dataset to build requests from')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--compare', help='Results JSON of an earlier run to diff against')
+        parser.add_argument('--keep', action='store_true', help="Don't delete the rows the run's create requests added")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.context = TrafficContext(rng, sample_size=options['sample_size'])
+        admin = User.objects.filter(email=BENCH_ADMIN_EMAIL).first()
+        if not (admin and self.context.products and self.context.categories and self.context.users and self.context.shoppers):
+            raise CommandError('No benchmark dataset, run seed_benchmark_data first')
+
+        self.client = Client(raise_request_exception=False)
+        self.tokens = {'admin': self.authorization(admin)}
+        self.shopper_tokens = {}
+        self.guest_sessions = {}
+        mix = TRAFFIC_MIXES[options['mix']]
+        names, weights = list(mix), list(mix.values())
+
+        try:
+            for name in rng.choices(names, weights, k=options['warmup']):
+                self.call(name)
+
+            stats = defaultdict(lambda: {'latencies': [], 'queries': [], 'status_codes': defaultdict(int)})
+            started = time.perf_counter()
+            for name in rng.choices(names, weights, k=options['requests']):
+                latency, queries, status_code = self.call(name)
+                stats[name]['latencies'].append(latency)
+                stats[name]['queries'].append(queries)
+                stats[name]['status_codes'][status_code] += 1
+            elapsed = time.perf_counter() - started
+        finally:
+            if not options['keep']:
+                clear_run()
+
+        results = self.results(options, stats, elapsed)
+        self.write_results(results)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f"Saved to {options['output']}")
+        if options['compare']:
+            with open(options['compare']) as earlier:
+                self.write_comparison(json.load(earlier), results)
+
+    def authorization(self, user):
+        return f"Bearer {create_jwt_token_for_user(user)['access_token']}"
+
+    def guest_session(self, cart_id):
+        """
+        Session Cookie Value Carrying A Guest Cart Id, As CartMixin Sets It
+        """
+        if cart_id not in self.guest_sessions:
+            session = import_module(settings.SESSION_ENGINE).SessionStore()
+            session['cart_id'] = cart_id
+            session.save()
+            self.guest_sessions[cart_id] = session.session_key
+        return self.guest_sessions[cart_id]
+
+    def call(self, name):
+        """
+        One Request, Returns Its Latency In Seconds, Queries Run & Status Code
+        * Building the request (picking ids, cart lines) happens before the clock starts
+        """
+        role, build = REQUESTS[name]
+        user_id = None
+        headers = {}
+        self.client.cookies.pop(settings.SESSION_COOKIE_NAME, None)
+        if role == 'shopper':
+            user_id = self.context.pick(self.context.shoppers)
+            if user_id not in self.shopper_tokens:
+                self.shopper_tokens[user_id] = self.authorization(User.objects.get(pk=user_id))
+            headers['HTTP_AUTHORIZATION'] = self.shopper_tokens[user_id]
+        elif role == 'guest':
+            user_id = self.context.pick(self.context.guest_carts)
+            self.client.cookies[settings.SESSION_COOKIE_NAME] = self.guest_session(user_id)
+        elif role == 'metrics':
+            if settings.METRICS_TOKEN:
+                headers['HTTP_AUTHORIZATION'] = f'Bearer {settings.METRICS_TOKEN}'
+        elif role:
+            headers['HTTP_AUTHORIZATION'] = self.tokens[role]
+        method, path, data = build(self.context, user_id)
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            if data is None:
+                response = getattr(self.client, method)(path, **headers)
+            elif any(hasattr(value, 'read') for value in data.values()):
+                response = getattr(self.client, method)(path, data, **headers)
+            else:
+                response = getattr(self.client, method)(path, data, content_type='application/json', **headers)
+            if response.streaming:
+                # Exports & import reports are produced while they are read
+                for _ in response.streaming_content:
+                    pass
+            latency = time.perf_counter() - started
+        return latency, len(queries), response.status_code
+
+    def results(self, options, stats, elapsed):
+        measured = sum(len(endpoint['latencies']) for endpoint in stats.values())
+        return {
+            'commit': git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'mix': options['mix'],
+            'seed': options['seed'],
+            'dataset': {
+                'products': Product.objects.count(),
+                'categories': Category.objects.count(),
+                'users': User.objects.count(),
+                'cart_lines': Cart.objects.count(),
+            },
+            'total': {
+                'requests': measured,
+                'seconds': elapsed,
+                'requests_per_second': measured / elapsed if elapsed else 0.0,
+                **summarize_latencies([latency for endpoint in stats.values() for latency in endpoint['latencies']]),
+                'queries_per_request': sum(sum(endpoint['queries']) for endpoint in stats.values()) / measured if measured else 0.0,
+            },
+            'endpoints': {
+                name: {
+                    'requests': len(endpoint['latencies']),
+                    **summarize_latencies(endpoint['latencies']),
+                    'queries_per_request': sum(endpoint['queries']) / len(endpoint['queries']),
+                    'max_queries': max(endpoint['queries']),
+                    'status_codes': dict(endpoint['status_codes']),
+                }
+                for name, endpoint in sorted(stats.items())
+            },
+        }
+
+    def write_results(self, results):
+        total = results['total']
+        self.stdout.write(
+            f"{results['mix']} mix @ {results['commit']} on {results['dataset']['products']} products: "
+            f"{total['requests']} requests in {total['seconds']:.2f}s -> {total['requests_per_second']:.1f} req/s, "
+            f"p50 {total['p50_ms']:.1f}  p95 {total['p95_ms']:.1f}  p99 {total['p99_ms']:.1f} ms, "
+            f"{total['queries_per_request']:.1f} queries/request"
+        )
+        self.stdout.write(f"{'endpoint':<24}{'requests':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}  status codes")
+        for name, endpoint in results['endpoints'].items():
+            self.stdout.write(
+                f"{name:<24}{endpoint['requests']:>9}{endpoint['p50_ms']:>9.1f}{endpoint['p95_ms']:>9.1f}{endpoint['p99_ms']:>9.1f}"
+                f"{endpoint['queries_per_request']:>9.1f}  {endpoint['status_codes']}"
+            )
+
+    def write_comparison(self, earlier, results):
+        """
+        Relative Change Of Every Endpoint In Both Runs, Negative Is Faster / Fewer Queries
+        """
+        def change(old, new):
+            return f'{(new - old) / old * 100:+.0f}%' if old else 'n/a'
+
+        self.stdout.write(f"\nvs {earlier.get('commit')} ({earlier.get('mix')} mix):")
+        self.stdout.write(f"{'endpoint':<24}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}")
+        rows = [('total', earlier['total'], results['total'])] + [
+            (name, earlier['endpoints'][name], endpoint)
+            for name, endpoint in results['endpoints'].items() if name in earlier['endpoints']
+        ]
+        for name, old, new in rows:
+            self.stdout.write(
+                f"{name:<24}" + ''.join(f'{change(old[key], new[key]):>9}' for key in ('p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request'))
+            )
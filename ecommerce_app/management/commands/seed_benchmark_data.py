@@ -0,0 +1,53 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from ecommerce_app.benchmark import BENCH_ADMIN_EMAIL, BENCH_PASSWORD, clear_dataset, seed_dataset
+from ecommerce_app.cache import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = (
+        'Insert the large benchmark catalog run_benchmark replays traffic against, '
+        f'rows are marked so --clear removes them again. The admin is {BENCH_ADMIN_EMAIL} / {BENCH_PASSWORD}'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--category-depth', type=int, default=5, help='Levels of the category forest')
+        parser.add_argument('--category-width', type=int, default=5, help='Roots & children per category')
+        parser.add_argument('--cart-users', type=int, default=1000, help='Users with a big cart')
+        parser.add_argument('--cart-lines', type=int, default=50, help='Lines in each big cart')
+        parser.add_argument('--guest-carts', type=int, default=1000, help='Anonymous sessions with a big cart')
+        parser.add_argument('--images-per-product', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--skip-search-index', action='store_true', help="Don't rebuild the search index afterwards")
+        parser.add_argument('--clear', action='store_true', help='Delete the benchmark dataset instead of seeding')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['clear']:
+            clear_dataset()
+            bump_catalog_version()
+            self.stdout.write(self.style.SUCCESS(f'Cleared the benchmark dataset in {time.perf_counter() - started:.1f}s'))
+            return
+
+        seed_dataset(
+            products=options['products'], users=options['users'],
+            category_depth=options['category_depth'], category_width=options['category_width'],
+            cart_users=options['cart_users'], cart_lines=options['cart_lines'], guest_carts=options['guest_carts'],
+            images_per_product=options['images_per_product'], batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        # bulk_create skips the signals keeping the search index, product cards & catalog cache in step
+        if not options['skip_search_index']:
+            call_command('rebuild_search_index', stdout=self.stdout)
+        call_command('rebuild_product_cards', stdout=self.stdout)
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Seeded the benchmark dataset in {time.perf_counter() - started:.1f}s'))
@@ -0,0 +1,233 @@
+from functools import wraps
+import bisect
+import contextvars
+import hmac
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+
+from ecommerce_app.cache import catalog_cache_stats
+
+# Request Metrics
+# * MetricsMiddleware files every request under its URL name & method: total time, query count, SQL time, serializer time,
+#   render time & response size
+# * Aggregated into histograms in process memory, metrics_view serves them in the Prometheus text format
+# * Every worker process keeps its own numbers, Prometheus sums them across the scraped processes
+# * Serializer time includes the queries its fields run, render time covers DRF renderers (async views render in the view)
+
+METRIC_PREFIX = 'ecommerce'
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name: (help, buckets, RequestMetrics attribute)
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Time from the metrics middleware to the response', SECONDS_BUCKETS, 'duration'),
+    'http_request_queries': ('SQL queries run by the request', QUERY_BUCKETS, 'queries'),
+    'http_request_sql_seconds': ('Time spent executing SQL', SECONDS_BUCKETS, 'sql'),
+    'http_request_serializer_seconds': ('Time spent building serializer data', SECONDS_BUCKETS, 'serializer'),
+    'http_request_render_seconds': ('Time spent rendering the response body', SECONDS_BUCKETS, 'render'),
+    'http_response_size_bytes': ('Size of the response body, streaming responses excluded', SIZE_BUCKETS, 'size'),
+}
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_lock = threading.Lock()
+# (histogram name, view, method): [bucket counts..., +Inf count, sum]
+_histograms = {}
+
+
+class RequestMetrics:
+    __slots__ = ('duration', 'queries', 'sql', 'serializer', 'render', 'size', 'timing')
+
+    def __init__(self):
+        self.duration = self.sql = self.serializer = self.render = 0.0
+        self.queries = 0
+        self.size = None
+        self.timing = set()
+
+
+def observe(view, method, metrics):
+    with _lock:
+        for name, (_, buckets, attribute) in HISTOGRAMS.items():
+            value = getattr(metrics, attribute)
+            if value is None:
+                continue
+            histogram = _histograms.get((name, view, method))
+            if histogram is None:
+                histogram = _histograms[(name, view, method)] = [0] * (len(buckets) + 1) + [0.0]
+            histogram[bisect.bisect_left(buckets, value)] += 1
+            histogram[-1] += value
+
+
+def reset_metrics():
+    with _lock:
+        _histograms.clear()
+
+
+# Timing Hooks
+def sql_timer(execute, sql, params, many, context):
+    """
+    Database Execute Wrapper Counting & Timing The Queries Of The Current Request
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql += time.perf_counter() - started
+        metrics.queries += 1
+
+
+def add_sql_timer(connection, **kwargs):
+    if sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_timer)
+
+
+def timed(func, attribute):
+    """
+    Wrap A Function So Its Time Is Added To The Current Request's `attribute`, Only The Outermost Call Counts
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        metrics = _current.get()
+        if metrics is None or attribute in metrics.timing:
+            return func(*args, **kwargs)
+        metrics.timing.add(attribute)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            setattr(metrics, attribute, getattr(metrics, attribute) + time.perf_counter() - started)
+            metrics.timing.discard(attribute)
+
+    wrapper.metrics_timed = True
+    return wrapper
+
+
+def timed_property(prop, attribute):
+    """
+    timed() For A Property's Getter
+    """
+    return property(timed(prop.fget, attribute), prop.fset, prop.fdel, prop.__doc__)
+
+
+def install():
+    """
+    Hook The Timers Into The ORM, Serializers & DRF Responses, Safe To Call More Than Once
+    * Serializer.data & ListSerializer.data both go through BaseSerializer.data, the read serializers through
+      ReadSerializer.serialize(), both count as serializer time
+    """
+    from ecommerce_app.serializers.read import ReadSerializer
+
+    connection_created.connect(add_sql_timer, dispatch_uid='ecommerce_app.metrics.sql_timer')
+    for connection in connections.all(initialized_only=True):
+        add_sql_timer(connection)
+
+    if not getattr(BaseSerializer.data.fget, 'metrics_timed', False):
+        BaseSerializer.data = timed_property(BaseSerializer.data, 'serializer')
+    if not getattr(ReadSerializer.serialize, 'metrics_timed', False):
+        ReadSerializer.serialize = timed(ReadSerializer.serialize, 'serializer')
+    if not getattr(Response.rendered_content.fget, 'metrics_timed', False):
+        Response.rendered_content = timed_property(Response.rendered_content, 'render')
+
+
+# Middleware
+class MetricsMiddleware:
+    """
+    Record The Metrics Of Every Request, Keep It First In MIDDLEWARE So Everything Below Is Timed
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, metrics, started)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, metrics, started)
+        return response
+
+    def record(self, request, response, metrics, started):
+        metrics.duration = time.perf_counter() - started
+        if not response.streaming:
+            metrics.size = len(response.content)
+        view = request.resolver_match.url_name if request.resolver_match else None
+        observe(view or 'unmatched', request.method, metrics)
+
+
+# Endpoint
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_metrics():
+    """
+    Every Histogram & The Catalog Cache Counters In The Prometheus Text Exposition Format
+    """
+    with _lock:
+        histograms = {key: list(values) for key, values in _histograms.items()}
+
+    lines = []
+    for name, (help_text, buckets, _) in HISTOGRAMS.items():
+        metric = f'{METRIC_PREFIX}_{name}'
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+        for (histogram_name, view, method), values in sorted(histogram for histogram in histograms.items() if histogram[0][0] == name):
+            labels = f'view="{escape_label(view)}",method="{escape_label(method)}"'
+            cumulative = 0
+            for bound, count in zip([*buckets, '+Inf'], values[:-1]):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{{labels}}} {values[-1]}')
+            lines.append(f'{metric}_count{{{labels}}} {cumulative}')
+
+    for counter, value in sorted(catalog_cache_stats().items()):
+        metric = f'{METRIC_PREFIX}_catalog_cache_{counter}_total'
+        lines += [f'# HELP {metric} Catalog cache {counter} in this process', f'# TYPE {metric} counter', f'{metric} {value}']
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Prometheus Scrape Endpoint
+    * Requires `Authorization: Bearer <METRICS_TOKEN>`, without a METRICS_TOKEN it is only served with DEBUG on
+    """
+    if not settings.METRICS_TOKEN:
+        if not settings.DEBUG:
+            raise Http404()
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}'):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -11,6 +11,12 @@ class Brand(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination scans this index from the cursor onwards
+            models.Index(fields=['status', 'created_at', 'id'], name='brand_status_created_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -23,6 +29,14 @@ class Category(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination scans this index from the cursor onwards
+            models.Index(fields=['status', 'created_at', 'id'], name='category_status_created_idx'),
+            # Active children of a category
+            models.Index(fields=['parent', 'status'], name='category_parent_status_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -39,6 +53,14 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination scans this index from the cursor onwards
+            models.Index(fields=['status', 'created_at', 'id'], name='product_status_created_idx'),
+            # Active products of the categories in a category tree
+            models.Index(fields=['category', 'status'], name='product_category_status_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -46,9 +68,50 @@ class ProductImage(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     product = models.ForeignKey(Product, related_name='images', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='product_images/')
+    # Resized & WebP copies, see ecommerce_app/images.py
+    variants = models.JSONField(default=dict, blank=True)
     status = models.PositiveIntegerField(default=STATUS_CHOICES[1][0], choices=STATUS_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Image for {self.product.name}"
\ No newline at end of file
+        return f"Image for {self.product.name}"
+
+
+class CatalogVersion(models.Model):
+    """
+    Catalog Version Shared By Every Worker, Used When The Catalog Cache Is Process Local (see ecommerce_app/cache.py)
+    """
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)  # A single row
+    version = models.BigIntegerField()
+
+
+class ProductCard(models.Model):
+    """
+    Storefront Card Of An Active Product, A Denormalized Copy Kept In Step By ecommerce_app/product_cards.py
+    """
+    id = models.UUIDField(primary_key=True, editable=False)  # The product's id
+    name = models.CharField(max_length=255)
+    brand_id = models.UUIDField(blank=True, null=True)
+    brand_name = models.CharField(max_length=255, blank=True, null=True)
+    category_id = models.UUIDField(blank=True, null=True)
+    category_name = models.CharField(max_length=255, blank=True, null=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    offer_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2)  # offer_price when set, price otherwise
+    # First active image of the product & its resized copies
+    image = models.ImageField(upload_to='product_images/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField()  # The product's, cards are listed newest product first
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Card listings, keyset pagination scans these from the cursor onwards, renames update through the last two
+            models.Index(fields=['created_at', 'id'], name='product_card_created_idx'),
+            models.Index(fields=['brand_id', 'created_at', 'id'], name='product_card_brand_idx'),
+            models.Index(fields=['category_id', 'created_at', 'id'], name='product_card_category_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
@@ -3,7 +3,7 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 import uuid
 
 from ecommerce_app.models.admin import Product
-from ecommerce_app.utils import STATUS_CHOICES, USER_CURRENCY, ADDRESS_TYPES, ORDER_STATUS
+from ecommerce_app.utils import STATUS_CHOICES, USER_CURRENCY, ADDRESS_TYPES, ORDER_STATUS, RESERVATION_STATUS
 
 
 class UsersManager(BaseUserManager):
@@ -52,6 +52,12 @@ class User(AbstractBaseUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name']
 
+    class Meta:
+        indexes = [
+            # user_list orders by created_at, keyset pagination scans this index from the cursor onwards
+            models.Index(fields=['status', 'created_at', 'id'], name='user_status_created_idx'),
+        ]
+
     def has_perm(self, perm, obj=None):
         return self.is_superadmin
 
@@ -92,6 +98,31 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # A user has at most one active line per product, add to cart & cart merges upsert against it
+            # Anonymous carts live in the guest cart store (see ecommerce_app/guest_cart.py), not in this table
+            models.UniqueConstraint(fields=['user', 'product'], condition=models.Q(status=STATUS_CHOICES[1][0]), name='unique_active_user_cart_product'),
+        ]
+        indexes = [
+            # Cart lookups by user & status of any status, the constraint above only covers active lines
+            models.Index(fields=['user', 'status', 'product'], name='cart_user_status_product_idx'),
+        ]
+
+class GuestCart(models.Model):
+    # An anonymous cart of the database guest cart store (see ecommerce_app/guest_cart.py), keyed by the session's cart_id
+    id = models.CharField(primary_key=True, max_length=256)
+    lines = models.JSONField(default=dict)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # purge_guest_carts deletes carts past their expiry
+            models.Index(fields=['expires_at'], name='guest_cart_expiry_idx'),
+        ]
+
 class ProductPurchase(models.Model):
     id = models.UUIDField(primary_key=True,default=uuid.uuid4,editable=False)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="productpurchase_user")
@@ -104,4 +135,29 @@ class ProductPurchase(models.Model):
     status = models.PositiveBigIntegerField(default=STATUS_CHOICES[1][0], choices= STATUS_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
+
+    class Meta:
+        indexes = [
+            # A user's purchases
+            models.Index(fields=['user', 'status'], name='purchase_user_status_idx'),
+            # Order export, read in creation order
+            models.Index(fields=['created_at', 'id'], name='purchase_created_idx'),
+        ]
+
+
+class StockReservation(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='stockreservation_user')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name='stockreservation_product')
+    purchase = models.ForeignKey(ProductPurchase, on_delete=models.SET_NULL, null=True, related_name='stockreservation_purchase')
+    quantity = models.PositiveIntegerField()
+    reservation_status = models.IntegerField(default=RESERVATION_STATUS[0][0], choices=RESERVATION_STATUS)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The sweeper looks up held reservations past their expiry
+            models.Index(fields=['reservation_status', 'expires_at'], name='reservation_status_expiry_idx'),
+        ]
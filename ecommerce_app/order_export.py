@@ -0,0 +1,100 @@
+import csv
+import io
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ecommerce_app.models.user import ProductPurchase
+from ecommerce_app.utils import STATUS_CHOICES, ORDER_STATUS
+
+# Order Export
+# * One flat row per purchase with its user, address & product columns, read with a single joined values_list() query
+# * .iterator() reads in chunks (a server-side cursor on PostgreSQL), rows are encoded & sent chunk by chunk,
+#   so memory stays flat whatever the number of orders
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_CHUNK_SIZE = 2000
+ORDER_STATUS_LABELS = dict(ORDER_STATUS)
+
+# (column, field path)
+EXPORT_COLUMNS = (
+    ('order_id', 'id'),
+    ('created_at', 'created_at'),
+    ('order_status', 'order_status'),
+    ('payment_status', 'payment_status'),
+    ('quantity', 'quantity'),
+    ('product_price', 'product_price'),
+    ('user_id', 'user_id'),
+    ('user_email', 'user__email'),
+    ('user_first_name', 'user__first_name'),
+    ('user_last_name', 'user__last_name'),
+    ('address_name', 'address__name'),
+    ('address_phone', 'address__phone'),
+    ('address_locality', 'address__locality'),
+    ('address_city', 'address__city'),
+    ('address_state', 'address__state'),
+    ('address_pincode', 'address__pincode'),
+    ('product_id', 'Product_id'),
+    ('product_name', 'Product__name'),
+)
+COLUMN_NAMES = [column for column, _ in EXPORT_COLUMNS]
+ORDER_STATUS_COLUMN = COLUMN_NAMES.index('order_status')
+CREATED_AT_COLUMN = COLUMN_NAMES.index('created_at')
+
+
+def export_queryset(created_from=None, created_to=None, order_status=None):
+    """
+    Active Purchases, Oldest First, Filtered By Creation Time (`created_from` Inclusive, `created_to` Exclusive) & Order Status
+    """
+    purchases = ProductPurchase.objects.filter(status=STATUS_CHOICES[1][0])
+    if created_from:
+        purchases = purchases.filter(created_at__gte=created_from)
+    if created_to:
+        purchases = purchases.filter(created_at__lt=created_to)
+    if order_status:
+        purchases = purchases.filter(order_status__in=order_status)
+    return purchases.order_by('created_at', 'id').values_list(*[path for _, path in EXPORT_COLUMNS])
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    for row in queryset.iterator(chunk_size=chunk_size):
+        row = list(row)
+        row[ORDER_STATUS_COLUMN] = ORDER_STATUS_LABELS[row[ORDER_STATUS_COLUMN]]
+        row[CREATED_AT_COLUMN] = row[CREATED_AT_COLUMN].isoformat()
+        yield row
+
+
+def csv_export(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield The Export As CSV, Header First, One Piece Of Text Per `chunk_size` Rows
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMN_NAMES)
+    for count, row in enumerate(export_rows(queryset, chunk_size), start=1):
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_export(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield The Export As NDJSON, One Object Per Order, One Piece Of Text Per `chunk_size` Rows
+    """
+    encoder = DjangoJSONEncoder()
+    lines = []
+    for row in export_rows(queryset, chunk_size):
+        lines.append(encoder.encode(dict(zip(COLUMN_NAMES, row))))
+        if len(lines) == chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+EXPORTERS = {
+    'csv': (csv_export, 'text/csv'),
+    'ndjson': (ndjson_export, 'application/x-ndjson'),
+}
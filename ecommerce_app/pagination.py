@@ -1,6 +1,125 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+import uuid
+
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset() For Async Views, The Count & The Page Are Read Through The Async ORM
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+
+        bottom = (number - 1) * paginator.per_page
+        self.page = Page([obj async for obj in queryset[bottom:bottom + paginator.per_page]], number, paginator)
+        return list(self.page)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor Pagination Keyed On (created_at, id), Newest First
+    * No COUNT(*) and no OFFSET, every page is an index range scan starting right after the previous page
+    * The cursor is an opaque token holding the last row's key
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.position_queryset(queryset, request)
+        # Fetch one extra row to know whether there is a next page
+        return self.finish_page(list(queryset[:self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.position_queryset(queryset, request)
+        return self.finish_page([obj async for obj in queryset[:self.page_size + 1]])
+
+    def position_queryset(self, queryset, request):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by('-created_at', '-id')
+        if position:
+            created_at, pk = position
+            # (created_at, id) < (cursor), with a plain range on created_at first so the index range scan can be used
+            queryset = queryset.filter(Q(created_at__lte=created_at), Q(created_at__lt=created_at) | Q(id__lt=pk))
+        return queryset
+
+    def finish_page(self, results):
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.has_next:
+            # Model instances or .values() rows
+            last = results[-1]
+            self.next_position = (last['created_at'], last['id']) if isinstance(last, dict) else (last.created_at, last.id)
+        else:
+            self.next_position = None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii').split('|')
+            return datetime.fromisoformat(created_at), uuid.UUID(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        created_at, pk = position
+        return urlsafe_b64encode(f'{created_at.isoformat()}|{pk.hex}'.encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.next_position:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+def get_paginator(request):
+    """
+    Keyset Pagination When The Client Opts In With The `cursor` Query Param (Empty For The First Page), Page Numbers Otherwise
+    * Searches are refused a cursor, keyset pages are ordered by (created_at, id) which would drop the search ranking
+    """
+    if KeysetPagination.cursor_query_param in request.query_params:
+        if request.query_params.get('search'):
+            raise ValidationError({KeysetPagination.cursor_query_param: ['Search results are ranked, page them with page & page_size.']})
+        return KeysetPagination()
+    return StandardResultsSetPagination()
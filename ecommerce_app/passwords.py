@@ -0,0 +1,68 @@
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+import logging
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from ecommerce_app.workers import BoundedProcessPool, WorkerPoolBusy
+
+# Password hashing runs in a bounded process pool (see ecommerce_app/workers.py), so a login storm keeps the hashing
+# to PASSWORD_HASH_WORKERS low priority processes instead of every request thread
+# PASSWORD_HASH_WORKERS = 0 hashes in the request thread, for hosts without multiprocessing (Vercel, AWS Lambda)
+
+logger = logging.getLogger(__name__)
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = {'status': 'error', 'data': 'Too many sign in requests right now, please try again shortly.'}
+    default_code = 'hashing_unavailable'
+    wait = 1  # Sent as Retry-After
+
+
+@lru_cache(maxsize=None)
+def get_password_pool():
+    return BoundedProcessPool(
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+        nice=settings.PASSWORD_HASH_NICE,
+    )
+
+
+def run_in_password_pool(fn, *args):
+    if not settings.PASSWORD_HASH_WORKERS:
+        return fn(*args)
+    try:
+        return get_password_pool().run(fn, *args, timeout=settings.PASSWORD_HASH_TIMEOUT)
+    except WorkerPoolBusy:
+        raise HashingUnavailable()
+    except (BrokenProcessPool, OSError):
+        # A pool process died or none can be started, the pool retries with a fresh executor on the next call
+        logger.exception('Password pool unavailable, set PASSWORD_HASH_WORKERS=0 where processes can not be started')
+        raise HashingUnavailable()
+
+
+def hash_password(raw_password):
+    """
+    make_password() In The Password Pool
+    """
+    return run_in_password_pool(make_password, raw_password)
+
+
+def verify_password(raw_password, encoded):
+    """
+    Check A Password In The Password Pool
+    * Returns (valid, new_encoded), new_encoded is the password rehashed with the current hasher settings when the
+      stored hash is outdated, None otherwise
+    """
+    return run_in_password_pool(_verify_password, raw_password, encoded)
+
+
+def _verify_password(raw_password, encoded):
+    # check_password calls the setter only for a valid password stored with an outdated hasher or iteration count
+    rehashed = []
+    valid = check_password(raw_password, encoded, setter=lambda raw: rehashed.append(make_password(raw)))
+    return valid, rehashed[0] if rehashed else None
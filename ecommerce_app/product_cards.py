@@ -0,0 +1,92 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from ecommerce_app.models.admin import Product, ProductCard, ProductImage
+from ecommerce_app.utils import STATUS_CHOICES
+
+# Product Cards
+# * ProductCard holds what a storefront card shows: the product, its brand & category names, its first active image
+#   (the oldest) & its effective price, so a card listing is one indexed scan of one table
+# * Every active product has a card, with the product's id, inactive & deleted products have none
+# * Product & ProductImage writes rebuild the cards of their products, brand & category renames are copied into
+#   their products' cards with one UPDATE each (see ecommerce_app/signals.py)
+# * bulk_create & update() skip signals, bulk writers call refresh_cards() themselves, `manage.py rebuild_product_cards`
+#   rebuilds every card
+
+CARD_BATCH_SIZE = 1000
+
+
+def refresh_cards(product_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Rebuild The Cards Of The Given Products
+    * Active products get a fresh card, the rest lose theirs
+    """
+    ids = list(product_ids)
+    if not ids:
+        return
+
+    with transaction.atomic(using=using):
+        for start in range(0, len(ids), CARD_BATCH_SIZE):
+            batch = ids[start:start + CARD_BATCH_SIZE]
+            products = Product.objects.using(using).filter(id__in=batch, status=STATUS_CHOICES[1][0]).values(
+                'id', 'name', 'brand_id', 'brand__name', 'category_id', 'category__name', 'price', 'offer_price', 'created_at',
+            )
+            images = first_images(batch, using)
+            ProductCard.objects.using(using).filter(id__in=batch).delete()
+            ProductCard.objects.using(using).bulk_create([build_card(product, images.get(product['id'])) for product in products])
+
+
+def first_images(product_ids, using=DEFAULT_DB_ALIAS):
+    """
+    The Oldest Active Image Of Each Product, As (Image Name, Variants) By Product Id
+    """
+    images = {}
+    rows = ProductImage.objects.using(using).filter(product_id__in=product_ids, status=STATUS_CHOICES[1][0]) \
+        .order_by('product_id', 'created_at', 'id').values_list('product_id', 'image', 'variants')
+    for product_id, image, variants in rows:
+        images.setdefault(product_id, (image, variants))
+    return images
+
+
+def build_card(product, image):
+    image, variants = image or (None, {})
+    return ProductCard(
+        id=product['id'],
+        name=product['name'],
+        brand_id=product['brand_id'],
+        brand_name=product['brand__name'],
+        category_id=product['category_id'],
+        category_name=product['category__name'],
+        price=product['price'],
+        offer_price=product['offer_price'],
+        effective_price=product['price'] if product['offer_price'] is None else product['offer_price'],
+        image=image,
+        image_variants=variants or {},
+        created_at=product['created_at'],
+    )
+
+
+def refresh_queryset(queryset):
+    """
+    Rebuild The Cards Of Every Product Of A Queryset In Batches
+    """
+    ids = []
+    for product_id in queryset.values_list('id', flat=True).iterator(chunk_size=CARD_BATCH_SIZE):
+        ids.append(product_id)
+        if len(ids) == CARD_BATCH_SIZE:
+            refresh_cards(ids, using=queryset.db)
+            ids = []
+    refresh_cards(ids, using=queryset.db)
+
+
+def copy_name(instance, deleted=False, using=DEFAULT_DB_ALIAS):
+    """
+    Copy A Brand's Or Category's Name Into The Cards Of Its Products, One UPDATE Whatever The Number Of Cards
+    * A deleted brand or category is unlinked, as the products' SET_NULL foreign key does
+    """
+    field = instance._meta.model_name
+    cards = ProductCard.objects.using(using).filter(**{f'{field}_id': instance.id})
+    if deleted:
+        return cards.update(**{f'{field}_id': None, f'{field}_name': None, 'updated_at': timezone.now()})
+    # update() skips auto_now, updated_at is set here so conditional GETs see the change
+    return cards.exclude(**{f'{field}_name': instance.name}).update(**{f'{field}_name': instance.name, 'updated_at': timezone.now()})
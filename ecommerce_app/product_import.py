@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+
+from django.db import transaction
+from rest_framework import serializers
+
+from ecommerce_app import product_cards, search
+from ecommerce_app.cache import bump_catalog_version
+from ecommerce_app.models.admin import Brand, Category, Product, ProductImage
+from ecommerce_app.serializers.admin import ProductImportRowSerializer
+from ecommerce_app.utils import STATUS_CHOICES
+
+# Bulk Product Import
+# * Streams CSV or NDJSON rows, memory stays flat whatever the file size: one chunk of products is held at a time
+# * Rows are validated by ProductImportRowSerializer against in-memory brand & category name maps, no query per row
+# * Valid rows are inserted with one bulk_create of products & one of images per chunk, invalid rows are reported & skipped
+# * bulk_create skips signals, each chunk is search indexed & gets its product cards, the catalog version is bumped once at the end
+#
+# CSV: header row with name, brand, category, price, offer_price, stock, description, status, images (paths split by `|`)
+# NDJSON: one object per line with the same keys, images as a list
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_BATCH_SIZE = 1000
+IMAGE_SEPARATOR = '|'
+
+
+def import_format(filename, content_type=None):
+    """
+    Format From The File Name Or Content Type, None When Neither Tells
+    """
+    name = (filename or '').lower()
+    if name.endswith('.csv') or content_type == 'text/csv':
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')) or content_type in ('application/x-ndjson', 'application/jsonl'):
+        return 'ndjson'
+    return None
+
+
+def read_rows(stream, file_format):
+    """
+    Yield (line number, row dict or None, parse error or None) From A Binary Or Text Stream
+    """
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Empty cells are missing values, images are one cell
+            row = {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+            if 'images' in row:
+                row['images'] = [image.strip() for image in row['images'].split(IMAGE_SEPARATOR) if image.strip()]
+            yield reader.line_num, row, None
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, None, {'non_field_errors': [f'Invalid JSON: {exc}']}
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, {'non_field_errors': ['Each line must be a JSON object.']}
+            continue
+        yield line_number, row, None
+
+
+def import_products(stream, file_format, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import Products From A Stream, Yielding `{'line': n, 'errors': {...}}` For Every Rejected Row
+    * The generator's return value is the summary: rows, created & failed counts
+    * Each chunk is committed on its own, an interrupted import keeps the chunks already written
+    """
+    context = {
+        'brands': dict(Brand.objects.filter(status=STATUS_CHOICES[1][0]).values_list('name', 'id')),
+        'categories': dict(Category.objects.filter(status=STATUS_CHOICES[1][0]).values_list('name', 'id')),
+    }
+    row_serializer = ProductImportRowSerializer(context=context)
+    summary = {'rows': 0, 'created': 0, 'failed': 0}
+    chunk = []
+
+    try:
+        for line_number, row, errors in read_rows(stream, file_format):
+            summary['rows'] += 1
+            if errors is None:
+                try:
+                    chunk.append(row_serializer.run_validation(row))
+                except serializers.ValidationError as exc:
+                    errors = exc.detail
+            if errors is not None:
+                summary['failed'] += 1
+                yield {'line': line_number, 'errors': errors}
+            if len(chunk) >= batch_size:
+                summary['created'] += create_products(chunk)
+                chunk = []
+        if chunk:
+            summary['created'] += create_products(chunk)
+    finally:
+        if summary['created']:
+            bump_catalog_version()
+    return summary
+
+
+def create_products(rows):
+    """
+    Insert One Chunk Of Validated Rows, Products & Images In Two Queries, Then Index The Products & Build Their Cards
+    """
+    products = []
+    images = []
+    for row in rows:
+        product = Product(
+            name=row['name'], brand_id=row.get('brand'), category_id=row['category'], price=row['price'],
+            offer_price=row['offer_price'], stock=row['stock'], description=row.get('description'),
+            status=row.get('status', STATUS_CHOICES[1][0]),
+        )
+        products.append(product)
+        images.extend(ProductImage(product=product, image=image) for image in row['images'])
+
+    with transaction.atomic():
+        Product.objects.bulk_create(products)
+        ProductImage.objects.bulk_create(images)
+        search.index_objects('product', [product.id for product in products])
+        product_cards.refresh_cards([product.id for product in products])
+    return len(products)
+
+
+def import_report(stream, file_format, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Run An Import, Yielding Its Report As NDJSON Lines: One Per Rejected Row, Then `{'status': 'success', 'data': summary}`
+    """
+    importer = import_products(stream, file_format, batch_size=batch_size)
+    while True:
+        try:
+            rejected = next(importer)
+        except StopIteration as finished:
+            yield json.dumps({'status': 'success', 'data': finished.value}) + '\n'
+            return
+        yield json.dumps(rejected) + '\n'
@@ -0,0 +1,56 @@
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Fast JSON
+# * orjson writes UUIDs & datetimes natively, aware UTC datetimes end in `Z` like DRF's encoder,
+#   everything else (Decimal, lazy strings, querysets, ...) goes through DRF's JSONEncoder.default()
+# * Without the optional `orjson` package, with an indent orjson can't produce (the browsable API) or a value orjson
+#   rejects (integers past 64 bits), the stock DRF classes do the work, so responses & accepted bodies never change
+# * U+2028/U+2029 are escaped like DRF does, the output stays safe to embed in a <script> tag
+
+_default_encoder = JSONEncoder()
+
+
+def _orjson_dumps(data):
+    content = orjson.dumps(data, default=_default_encoder.default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    if b'\xe2\x80' in content:
+        content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return content
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.ensure_ascii or self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return _orjson_dumps(data)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        # orjson only reads UTF-8 & always rejects NaN & Infinity, as the stock parser does with STRICT_JSON
+        if orjson is None or not api_settings.STRICT_JSON or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,130 @@
+from collections import defaultdict
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, F, Case, When
+from django.utils import timezone
+
+from ecommerce_app.models.admin import Product
+from ecommerce_app.models.user import ProductPurchase, StockReservation
+from ecommerce_app.utils import STATUS_CHOICES, RESERVATION_STATUS, ORDER_STATUS
+from ecommerce_app.cache import bump_catalog_version
+
+# Stock Reservation Engine
+# * `Product.stock` is the stock still available to sell, a hold takes its quantity out straight away
+# * Every stock change is a single conditional UPDATE, so concurrent buyers can never take the same units
+# * Holds are confirmed once paid, released when cancelled and expired by the sweeper when left unpaid
+# * An expired hold cancels its unpaid purchase, a purchase can only be paid while its holds are still HELD
+# * Transactions changing holds write before they read (see lock_rows()), so on SQLite they take the write lock up front
+#   instead of upgrading a read lock, which fails straight away when another writer is waiting
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = list(product_ids)
+        super().__init__('Insufficient stock')
+
+
+def lock_rows(queryset):
+    """
+    Lock The Rows Of `queryset` Until The Transaction Ends With A No-op UPDATE, Returns `queryset`
+    * Row locks on PostgreSQL & MySQL, the database write lock on SQLite, where select_for_update() does nothing
+    """
+    queryset.update(**{queryset.model._meta.pk.attname: F(queryset.model._meta.pk.attname)})
+    return queryset
+
+
+def check_available(product, quantity):
+    """
+    Whether The Product Still Has `quantity` Units Available, Held Units Excluded
+    """
+    return product.stock >= quantity
+
+
+def hold_stock(user, quantities, purchases=None, ttl=None):
+    """
+    Take `quantities` ({product_id: quantity}) Out Of Stock With One Conditional UPDATE And Record The Holds
+    * Raises InsufficientStock & changes nothing when any product doesn't have enough stock left
+    """
+    if not quantities:
+        return []
+    purchases = purchases or {}
+    expires_at = timezone.now() + (ttl or timedelta(minutes=settings.STOCK_HOLD_MINUTES))
+
+    with transaction.atomic():
+        updated = Product.objects.filter(
+            reduce(or_, [Q(id=product_id, stock__gte=quantity) for product_id, quantity in quantities.items()]),
+            status=STATUS_CHOICES[1][0],
+        ).update(
+            stock=Case(*[When(id=product_id, then=F('stock') - quantity) for product_id, quantity in quantities.items()]),
+            updated_at=timezone.now(),  # update() skips auto_now, conditional GETs of the product read it
+        )
+
+        if updated != len(quantities):
+            # Some product was short, raising rolls back the rows already decremented
+            raise InsufficientStock(quantities)
+
+        reservations = StockReservation.objects.bulk_create([
+            StockReservation(
+                user=user,
+                product_id=product_id,
+                purchase=purchases.get(product_id),
+                quantity=quantity,
+                expires_at=expires_at,
+            )
+            for product_id, quantity in quantities.items()
+        ])
+        transaction.on_commit(bump_catalog_version)
+    return reservations
+
+
+def confirm_holds(reservations):
+    """
+    Mark Held Reservations As Paid, The Stock Stays Taken
+    """
+    return reservations.filter(reservation_status=RESERVATION_STATUS[0][0]).update(reservation_status=RESERVATION_STATUS[1][0])
+
+
+def release_holds(reservations, reservation_status=RESERVATION_STATUS[2][0], cancel_purchases=False):
+    """
+    Put The Stock Of Held Reservations Back, One UPDATE For The Reservations & One For The Products
+    * With `cancel_purchases` the unpaid purchases of the released holds are cancelled too, in the same transaction
+    """
+    with transaction.atomic():
+        held = list(
+            lock_rows(reservations.filter(reservation_status=RESERVATION_STATUS[0][0]))
+            .values_list('id', 'product_id', 'quantity', 'purchase_id')
+        )
+        if not held:
+            return 0
+
+        StockReservation.objects.filter(id__in=[reservation_id for reservation_id, _, _, _ in held]).update(reservation_status=reservation_status)
+
+        quantities = defaultdict(int)
+        for _, product_id, quantity, _ in held:
+            if product_id:
+                quantities[product_id] += quantity
+        if quantities:
+            Product.objects.filter(id__in=quantities).update(
+                stock=Case(*[When(id=product_id, then=F('stock') + quantity) for product_id, quantity in quantities.items()]),
+                updated_at=timezone.now(),
+            )
+            transaction.on_commit(bump_catalog_version)
+
+        if cancel_purchases:
+            # update() skips auto_now
+            ProductPurchase.objects.filter(
+                id__in={purchase_id for _, _, _, purchase_id in held if purchase_id}, payment_status=False,
+            ).update(order_status=ORDER_STATUS[4][0], updated_at=timezone.now())
+    return len(held)
+
+
+def expire_stale_holds(now=None):
+    """
+    Release Every Hold That Wasn't Paid Before It Expired & Cancel Its Purchase
+    """
+    stale = StockReservation.objects.filter(reservation_status=RESERVATION_STATUS[0][0], expires_at__lte=now or timezone.now())
+    return release_holds(stale, reservation_status=RESERVATION_STATUS[3][0], cancel_purchases=True)
@@ -0,0 +1,192 @@
+import re
+import uuid
+
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.db.models import Case, When, IntegerField
+
+from ecommerce_app.models.admin import Brand, Category, Product
+from ecommerce_app.utils import STATUS_CHOICES
+
+# Inverted indexes kept next to the catalog tables
+# * SQLite: one FTS5 virtual table per object type, rowid derived from the object's UUID
+# * PostgreSQL: one table per object type holding a weighted tsvector behind a GIN index
+# Columns are listed with their rank weight, A being the most relevant
+SEARCH_INDEXES = {
+    'product': {
+        'table': 'ecommerce_app_product_search',
+        'model': Product,
+        'columns': [('name', 'name', 'A'), ('brand', 'brand__name', 'B'), ('category', 'category__name', 'B'), ('description', 'description', 'C')],
+    },
+    'brand': {
+        'table': 'ecommerce_app_brand_search',
+        'model': Brand,
+        'columns': [('name', 'name', 'A'), ('description', 'description', 'C')],
+    },
+    'category': {
+        'table': 'ecommerce_app_category_search',
+        'model': Category,
+        'columns': [('name', 'name', 'A'), ('description', 'description', 'C')],
+    },
+}
+
+RANK_WEIGHTS = {'A': 10.0, 'B': 4.0, 'C': 1.0}
+SEARCH_RESULT_LIMIT = 1000
+INDEX_BATCH_SIZE = 1000
+
+
+class SqliteSearchBackend:
+    def create(self, cursor, index):
+        columns = ', '.join(column for column, _, _ in index['columns'])
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {index['table']} USING fts5("
+            f"object_id UNINDEXED, {columns}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+
+    def delete(self, cursor, index, ids):
+        rowids = [self.rowid(object_id) for object_id in ids]
+        cursor.execute(f"DELETE FROM {index['table']} WHERE rowid IN ({', '.join(['%s'] * len(rowids))})", rowids)
+
+    def insert(self, cursor, index, rows):
+        columns = ', '.join(column for column, _, _ in index['columns'])
+        placeholders = ', '.join(['%s'] * (len(index['columns']) + 2))
+        cursor.executemany(
+            f"INSERT INTO {index['table']} (rowid, object_id, {columns}) VALUES ({placeholders})",
+            [(self.rowid(row[0]), row[0].hex, *(value or '' for value in row[1:])) for row in rows],
+        )
+
+    def search(self, cursor, index, terms, limit):
+        match = ' '.join('"%s"*' % term for term in terms)
+        weights = ', '.join(str(RANK_WEIGHTS[weight]) for _, _, weight in index['columns'])
+        cursor.execute(
+            f"SELECT object_id FROM {index['table']} WHERE {index['table']} MATCH %s "
+            f"ORDER BY bm25({index['table']}, 0, {weights}) LIMIT %s",
+            [match, limit],
+        )
+        return [uuid.UUID(object_id) for object_id, in cursor.fetchall()]
+
+    @staticmethod
+    def rowid(object_id):
+        # Top 63 bits of the UUID, so the index row can be found without scanning the table
+        return object_id.int >> 65
+
+
+class PostgresSearchBackend:
+    def create(self, cursor, index):
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {index['table']} (object_id uuid PRIMARY KEY, document tsvector NOT NULL)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index['table']}_document ON {index['table']} USING GIN (document)")
+
+    def delete(self, cursor, index, ids):
+        cursor.execute(f"DELETE FROM {index['table']} WHERE object_id = ANY(%s)", [list(ids)])
+
+    def insert(self, cursor, index, rows):
+        document = ' || '.join(f"setweight(to_tsvector('simple', %s), '{weight}')" for _, _, weight in index['columns'])
+        cursor.executemany(
+            f"INSERT INTO {index['table']} (object_id, document) VALUES (%s, {document}) "
+            f"ON CONFLICT (object_id) DO UPDATE SET document = EXCLUDED.document",
+            [(row[0], *(value or '' for value in row[1:])) for row in rows],
+        )
+
+    def search(self, cursor, index, terms, limit):
+        # ts_rank takes the weights in {D, C, B, A} order
+        weights = '{%s}' % ', '.join(str(RANK_WEIGHTS.get(weight, 0.1)) for weight in 'DCBA')
+        cursor.execute(
+            f"SELECT object_id FROM {index['table']}, to_tsquery('simple', %s) query "
+            f"WHERE document @@ query ORDER BY ts_rank(%s::float4[], document, query) DESC LIMIT %s",
+            [' & '.join('%s:*' % term for term in terms), weights, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+SEARCH_BACKENDS = {
+    'sqlite': SqliteSearchBackend(),
+    'postgresql': PostgresSearchBackend(),
+}
+
+
+def get_search_backend(using=DEFAULT_DB_ALIAS):
+    return SEARCH_BACKENDS.get(connections[using].vendor)
+
+
+def tokenize(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def create_search_indexes(using=DEFAULT_DB_ALIAS):
+    """
+    Create The Search Tables If They Don't Exist Yet
+    """
+    backend = get_search_backend(using)
+    if not backend:
+        return
+    with connections[using].cursor() as cursor:
+        for index in SEARCH_INDEXES.values():
+            backend.create(cursor, index)
+
+
+def index_objects(object_type, ids, using=DEFAULT_DB_ALIAS):
+    """
+    Refresh The Index Rows Of The Given Objects
+    * Active objects are (re)indexed, the rest are dropped from the index
+    """
+    backend = get_search_backend(using)
+    ids = list(ids)
+    if not backend or not ids:
+        return
+
+    index = SEARCH_INDEXES[object_type]
+    sources = [source for _, source, _ in index['columns']]
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for start in range(0, len(ids), INDEX_BATCH_SIZE):
+            batch = ids[start:start + INDEX_BATCH_SIZE]
+            rows = list(index['model'].objects.using(using).filter(id__in=batch, status=STATUS_CHOICES[1][0]).values_list('id', *sources))
+            backend.delete(cursor, index, batch)
+            if rows:
+                backend.insert(cursor, index, rows)
+
+
+def remove_objects(object_type, ids, using=DEFAULT_DB_ALIAS):
+    backend = get_search_backend(using)
+    ids = list(ids)
+    if backend and ids:
+        with connections[using].cursor() as cursor:
+            backend.delete(cursor, SEARCH_INDEXES[object_type], ids)
+
+
+def index_queryset(object_type, queryset):
+    """
+    Reindex Every Object Of A Queryset In Batches
+    """
+    ids = []
+    for object_id in queryset.values_list('id', flat=True).iterator(chunk_size=INDEX_BATCH_SIZE):
+        ids.append(object_id)
+        if len(ids) == INDEX_BATCH_SIZE:
+            index_objects(object_type, ids, using=queryset.db)
+            ids = []
+    index_objects(object_type, ids, using=queryset.db)
+
+
+def search_ids(object_type, query, limit=SEARCH_RESULT_LIMIT, using=DEFAULT_DB_ALIAS):
+    """
+    Ids Of The Objects Matching Every Word Of `query` As A Prefix, Best Match First
+    """
+    backend = get_search_backend(using)
+    terms = tokenize(query)
+    if not terms:
+        return []
+    with connections[using].cursor() as cursor:
+        return backend.search(cursor, SEARCH_INDEXES[object_type], terms, limit)
+
+
+def search_queryset(queryset, object_type, query):
+    """
+    Narrow A Queryset Down To The Search Results, Ordered By Rank
+    * Falls back to a name match on databases without a search backend
+    """
+    if not get_search_backend(queryset.db):
+        return queryset.filter(name__icontains=query)
+
+    ids = search_ids(object_type, query, using=queryset.db)
+    if not ids:
+        return queryset.none()
+    rank = Case(*[When(id=object_id, then=position) for position, object_id in enumerate(ids)], output_field=IntegerField())
+    return queryset.filter(id__in=ids).order_by(rank)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from ecommerce_app.models.admin import *
+from ecommerce_app.images import variant_urls
 from ecommerce_app.utils import STATUS_CHOICES
 
 class BrandSerializer(serializers.ModelSerializer):
@@ -18,13 +19,20 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'parent', 'children', 'product', 'status', 'status_text', 'created_at', 'updated_at']
 
     def get_children(self, obj):
-        return CategorySerializer(obj.children.filter(status = STATUS_CHOICES[1][0]), many=True, context=self.context).data
+        # Use the sub tree loaded by build_category_tree when available
+        children = getattr(obj, 'active_children', None)
+        if children is None:
+            children = obj.children.filter(status = STATUS_CHOICES[1][0])
+        return CategorySerializer(children, many=True, context=self.context).data
     
     def get_status_text(self, obj):
         return STATUS_CHOICES[obj.status][1]
         
     def get_product(self, obj):
-        return ProductSerializer(obj.product_category.filter(status = STATUS_CHOICES[1][0]), many=True, context=self.context).data
+        products = getattr(obj, 'active_products', None)
+        if products is None:
+            products = obj.product_category.filter(status = STATUS_CHOICES[1][0])
+        return ProductSerializer(products, many=True, context=self.context).data
     
 # class ProductSerializer(serializers.ModelSerializer):
 #     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.filter(status = STATUS_CHOICES[1][0]), required=True)
@@ -34,11 +42,17 @@ class CategorySerializer(serializers.ModelSerializer):
 #         fields = ['id', 'name', 'brand', 'category', 'price', 'stock', 'description', 'created_at', 'updated_at']
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    # URLs of the resized copies by variant name, empty until they are generated
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
-        fields = ['id', 'product', 'image', 'status', 'created_at', 'updated_at']
+        fields = ['id', 'product', 'image', 'variants', 'status', 'created_at', 'updated_at']
         extra_kwargs = {'product': {'read_only': True}}  # product is auto-linked
 
+    def get_variants(self, instance):
+        return variant_urls(instance.variants, instance.image.storage)
+
 
 class ProductSerializer(serializers.ModelSerializer):
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.filter(status=STATUS_CHOICES[1][0]), required=True)
@@ -51,8 +65,10 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'brand', 'category', 'price', 'offer_price', 'stock', 'description', 'status', 'created_at', 'updated_at', 'images']
 
     def get_images(self, instance):
-        # Only return images where status is 1 (active)
-        active_images = instance.productimage_set.filter(status=STATUS_CHOICES[1][0])
+        # Only return images where status is 1 (active), preferring the ones loaded by attach_active_images
+        active_images = getattr(instance, 'active_images', None)
+        if active_images is None:
+            active_images = instance.images.filter(status=STATUS_CHOICES[1][0])
         return ProductImageSerializer(active_images, many=True).data
 
     def validate(self, data):
@@ -105,3 +121,52 @@ class ProductSerializer(serializers.ModelSerializer):
                 ProductImage.objects.create(product=product, **image_data)
 
         return product
+
+
+class ProductCardSerializer(serializers.ModelSerializer):
+    # URLs of the resized copies of the card's image, empty until they are generated
+    image_variants = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProductCard
+        fields = ['id', 'name', 'brand_id', 'brand_name', 'category_id', 'category_name', 'price', 'offer_price', 'effective_price', 'image', 'image_variants', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+    def get_image_variants(self, instance):
+        return variant_urls(instance.image_variants, instance.image.storage)
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    """
+    One Row Of A Bulk Product Import, Same Rules As ProductSerializer
+    * Brand & category are given by name and resolved through the `brands` & `categories` name -> id maps in the context
+    * Images are paths of already uploaded files, at least one is required
+    """
+    name = serializers.CharField(max_length=255)
+    brand = serializers.CharField(required=False, allow_blank=True)
+    category = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    offer_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+    stock = serializers.IntegerField(min_value=0)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    status = serializers.ChoiceField(choices=STATUS_CHOICES, required=False)
+    images = serializers.ListField(child=serializers.CharField(max_length=100), allow_empty=False)
+
+    def validate_brand(self, value):
+        if not value:
+            return None
+        if value not in self.context['brands']:
+            raise serializers.ValidationError(f'Unknown or inactive brand "{value}".')
+        return self.context['brands'][value]
+
+    def validate_category(self, value):
+        if value not in self.context['categories']:
+            raise serializers.ValidationError(f'Unknown or inactive category "{value}".')
+        return self.context['categories'][value]
+
+    def validate(self, data):
+        if data.get('offer_price') is None:
+            data['offer_price'] = data['price']
+        if data['offer_price'] > data['price']:
+            raise serializers.ValidationError({"offer_price": "Offer price cannot be greater than the actual price."})
+        return data
@@ -0,0 +1,158 @@
+from collections import defaultdict
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import QuerySet
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from ecommerce_app.images import variant_urls
+from ecommerce_app.models.admin import ProductCard, ProductImage
+from ecommerce_app.serializers.admin import ProductCardSerializer, ProductImageSerializer, ProductSerializer
+from ecommerce_app.serializers.user import CartSerializer, UserSerializer
+from ecommerce_app.utils import STATUS_CHOICES
+
+# Read Serializers
+# * Plain dicts built straight from `.values()` rows, for list endpoints that only read
+# * The field plan is compiled once per class from the DRF serializer it stands in for: same readable fields, same order,
+#   same representations, so a field added to the DRF serializer shows up here too
+# * Each field's own to_representation() is kept except where a plain conversion gives the same value
+#   (str() for char & UUID fields, int() for integers, the raw id for primary key relations)
+# * A field this layer can't read from a row (dotted sources, nested serializers, ...) fails at compile time
+# * `manage.py check_read_serializers` compares the rendered output with the DRF serializers on real rows
+
+
+def _file_url(storage):
+    # FileField.to_representation() without a request in the context
+    def convert(value):
+        return storage.url(str(value)) if value else None
+    return convert
+
+
+def _converter(field):
+    field_class = type(field)
+    if field_class in (serializers.CharField, serializers.EmailField):
+        return str
+    if field_class is serializers.UUIDField and field.uuid_format == 'hex_verbose':
+        return str
+    if field_class is serializers.IntegerField:
+        return int
+    return field.to_representation
+
+
+class ReadSerializer:
+    """
+    Read Only Stand In For `serializer_class`, Serializing `.values()` Rows
+    * Method fields call `get_<field name>(row)` on the read serializer, `extra_columns` are loaded for them
+    * prefetch(rows) runs once per batch, before any row is serialized, to load what method fields need
+    """
+    serializer_class = None
+    extra_columns = ()
+    _compiled = None
+
+    @classmethod
+    def compile(cls):
+        if cls.__dict__.get('_compiled') is not None:
+            return cls._compiled
+
+        serializer = cls.serializer_class()
+        model_meta = serializer.Meta.model._meta
+        plan, columns = [], []
+        for field in serializer._readable_fields:
+            if isinstance(field, serializers.SerializerMethodField):
+                if not hasattr(cls, field.method_name):
+                    raise ImproperlyConfigured(f'{cls.__name__} needs {field.method_name}() for {field.field_name}')
+                plan.append((field.field_name, None, field.method_name))
+                continue
+            if '.' in field.source or field.source == '*':
+                raise ImproperlyConfigured(f'{cls.__name__} can not read the source "{field.source}" of {field.field_name}')
+
+            model_field = model_meta.get_field(field.source)
+            if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+                convert = None
+            elif isinstance(field, (serializers.RelatedField, serializers.BaseSerializer)):
+                raise ImproperlyConfigured(f'{cls.__name__} can not read the relation {field.field_name}')
+            elif isinstance(field, serializers.FileField):
+                use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+                convert = _file_url(model_field.storage) if use_url else str
+            else:
+                convert = _converter(field)
+            plan.append((field.field_name, model_field.attname, convert))
+            columns.append(model_field.attname)
+
+        columns += [column for column in cls.extra_columns if column not in columns]
+        cls._compiled = (plan, columns)
+        return cls._compiled
+
+    @property
+    def columns(self):
+        return self.compile()[1]
+
+    def values(self, queryset):
+        """
+        `queryset` Narrowed Down To The Columns This Serializer Reads, Rows Come Back As Dicts
+        """
+        return queryset.values(*self.columns)
+
+    def serialize(self, rows):
+        """
+        Representations Of `rows`, A QuerySet, `.values()` Rows Or Model Instances
+        """
+        if isinstance(rows, QuerySet):
+            rows = self.values(rows)
+        columns = self.columns
+        rows = [row if isinstance(row, dict) else {column: getattr(row, column) for column in columns} for row in rows]
+        self.prefetch(rows)
+        return [self.to_representation(row) for row in rows]
+
+    def prefetch(self, rows):
+        pass
+
+    def to_representation(self, row):
+        data = {}
+        for name, column, convert in self.compile()[0]:
+            if column is None:
+                data[name] = getattr(self, convert)(row)
+                continue
+            value = row[column]
+            data[name] = value if value is None or convert is None else convert(value)
+        return data
+
+
+class ProductImageReadSerializer(ReadSerializer):
+    serializer_class = ProductImageSerializer
+    extra_columns = ('variants',)
+
+    def get_variants(self, row):
+        return variant_urls(row['variants'], ProductImage._meta.get_field('image').storage)
+
+
+class ProductReadSerializer(ReadSerializer):
+    serializer_class = ProductSerializer
+
+    def prefetch(self, rows):
+        # The active images of every product in one query, as attach_active_images() does
+        self.images = defaultdict(list)
+        if not rows:
+            return
+        images = ProductImage.objects.filter(product_id__in=[row['id'] for row in rows], status=STATUS_CHOICES[1][0])
+        for image in ProductImageReadSerializer().serialize(images):
+            self.images[image['product']].append(image)
+
+    def get_images(self, row):
+        return self.images[row['id']]
+
+
+class ProductCardReadSerializer(ReadSerializer):
+    serializer_class = ProductCardSerializer
+    extra_columns = ('image_variants',)
+
+    def get_image_variants(self, row):
+        return variant_urls(row['image_variants'], ProductCard._meta.get_field('image').storage)
+
+
+class UserReadSerializer(ReadSerializer):
+    serializer_class = UserSerializer
+
+
+class CartReadSerializer(ReadSerializer):
+    serializer_class = CartSerializer
@@ -2,6 +2,10 @@ from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
 from ecommerce_app.models.user import *
+from ecommerce_app.order_export import EXPORT_FORMATS
+from ecommerce_app.utils import ORDER_STATUS
+from ecommerce_app.reservations import check_available
+from ecommerce_app.passwords import hash_password
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -40,7 +44,7 @@ class UserSerializer(serializers.ModelSerializer):
         password = validated_data.pop('password', None)
         instance = self.Meta.model(**validated_data)
         if password:
-            instance.set_password(password)
+            instance.password = hash_password(password)
         instance.save()
         return instance
 
@@ -49,7 +53,7 @@ class UserSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         if password:
-            instance.set_password(password)
+            instance.password = hash_password(password)
         instance.save()
         return instance
 
@@ -66,16 +70,19 @@ class CartSerializer(serializers.ModelSerializer):
     def validate(self, data):
         quantity = data.get('quantity')
         product = data.get('product')
-        if product.stock < quantity:
+        if not check_available(product, quantity):
             raise serializers.ValidationError({'product': 'Out of stock'})
         return data
     
     class Meta:
         model = Cart
         fields = ['id', 'user', 'product', 'quantity', 'status', 'created_at', 'updated_at']
+        # Adding a product already in the cart adds to its line (see upsert_cart_lines), the one active line per
+        # product constraint must not turn that into a "must make a unique set" error
+        validators = []
 
 class ProductPurchaseSerializer(serializers.ModelSerializer):
-    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.filter(status = STATUS_CHOICES[1][0]), required=True)
+    product = serializers.PrimaryKeyRelatedField(source='Product', queryset=Product.objects.filter(status = STATUS_CHOICES[1][0]), required=True)
     address = serializers.PrimaryKeyRelatedField(queryset=Address.objects.filter(status = STATUS_CHOICES[1][0]), required=True)
 
     class Meta:
@@ -91,3 +98,20 @@ class ProductPurchaseSerializer(serializers.ModelSerializer):
         instance.order_status = validated_data.get('order_status', instance.order_status)
         instance.save()
         return instance
+
+
+class OrderExportSerializer(serializers.Serializer):
+    """
+    Query Params Of The Order Export
+    * created_from (inclusive) & created_to (exclusive) take an ISO datetime or a date
+    * order_status can be repeated, e.g. ?order_status=2&order_status=3
+    """
+    export_format = serializers.ChoiceField(choices=EXPORT_FORMATS, default='csv')
+    created_from = serializers.DateTimeField(required=False, input_formats=['iso-8601', '%Y-%m-%d'])
+    created_to = serializers.DateTimeField(required=False, input_formats=['iso-8601', '%Y-%m-%d'])
+    order_status = serializers.MultipleChoiceField(choices=ORDER_STATUS, required=False)
+
+    def validate(self, data):
+        if data.get('created_from') and data.get('created_to') and data['created_from'] >= data['created_to']:
+            raise serializers.ValidationError({'created_to': 'created_to must be after created_from.'})
+        return data
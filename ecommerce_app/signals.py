@@ -1,25 +1,115 @@
+from functools import partial
+import logging
+
 from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, post_migrate
 from django.dispatch import receiver
 
-from ecommerce_app.models import Cart
-from ecommerce_app.utils import STATUS_CHOICES
+from ecommerce_app.models import Brand, Category, Product, ProductImage, User
+from ecommerce_app.cache import bump_catalog_version
+from ecommerce_app.helper import upsert_cart_lines
+from ecommerce_app.guest_cart import GuestCartBusy, get_guest_cart_store
+from ecommerce_app.authentication import invalidate_user_snapshot
+from ecommerce_app import product_cards, search
+from ecommerce_app.images import queue_variants
+
+logger = logging.getLogger(__name__)
 
 @receiver(user_logged_in)
 def transfer_cart_to_user(sender, request, user, **kwargs):
+    """
+    Write The Guest Cart Into The User's Cart
+    * One upsert adds the guest quantities to the user's active lines, then the guest cart is dropped from its store
+    * A cart locked for too long is left in the session, the login goes through & the next one transfers it
+    """
     session_id = request.session.get('cart_id')
     if session_id:
-        session_cart_items = Cart.objects.filter(session_id=session_id, status=STATUS_CHOICES[1][0])
-
-        for item in session_cart_items:
-            user_cart_item, created = Cart.objects.get_or_create(
-                user=user,
-                product=item.product,
-                status=STATUS_CHOICES[1][0],
-                defaults={'quantity': item.quantity}
-            )
-            if not created:
-                user_cart_item.quantity += item.quantity
-                user_cart_item.save()
-
-        session_cart_items.delete()
+        guest_cart_store = get_guest_cart_store()
+        try:
+            # Under the cart's lock, an add landing mid transfer would be dropped with the guest cart
+            with guest_cart_store.locked(session_id):
+                quantities = guest_cart_store.quantities(session_id)
+                if quantities:
+                    upsert_cart_lines(quantities, user_id=user.id)
+                guest_cart_store.clear(session_id)
+        except GuestCartBusy:
+            logger.warning('Guest cart %s not transferred to user %s, its lock is taken', session_id, user.id)
+            return
         del request.session['cart_id']
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Covers update_user, delete_user & any other User.save, so status & role changes apply on the next request
+    invalidate_user_snapshot(instance.pk)
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=Brand)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_catalog_version()
+
+
+# Search index
+@receiver(post_migrate)
+def create_search_indexes(sender, using, **kwargs):
+    if sender.name == 'ecommerce_app':
+        search.create_search_indexes(using=using)
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    search.index_objects('product', [instance.id])
+
+@receiver(pre_save, sender=Brand)
+@receiver(pre_save, sender=Category)
+def track_indexed_name(sender, instance, **kwargs):
+    # The name as stored before this save, None for new rows
+    instance._indexed_name = None if instance._state.adding else sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+def index_brand_or_category(sender, instance, created, **kwargs):
+    object_type = sender._meta.model_name
+    search.index_objects(object_type, [instance.id])
+    if not created and getattr(instance, '_indexed_name', None) != instance.name:
+        # Product documents carry the brand & category names, only a rename touches them
+        # Reindexed once the save commits, a rolled back rename leaves them alone
+        products = Product.objects.filter(**{f'{object_type}_id': instance.id})
+        transaction.on_commit(partial(search.index_queryset, 'product', products))
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Category)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_objects(sender._meta.model_name, [instance.id])
+
+
+# Image variants
+@receiver(post_save, sender=ProductImage)
+def generate_image_variants(sender, instance, created, **kwargs):
+    # Queued after commit so the pool never works on an image that is rolled back
+    if instance.image and (created or not instance.variants):
+        transaction.on_commit(partial(queue_variants, instance.id, instance.image.name))
+
+
+# Product cards
+@receiver([post_save, post_delete], sender=Product)
+def refresh_product_card(sender, instance, **kwargs):
+    # A deleted or inactive product loses its card
+    product_cards.refresh_cards([instance.id])
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def refresh_product_card_image(sender, instance, **kwargs):
+    product_cards.refresh_cards([instance.product_id])
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+def copy_name_to_product_cards(sender, instance, created, **kwargs):
+    if not created:
+        product_cards.copy_name(instance)
+
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Category)
+def unlink_product_cards(sender, instance, **kwargs):
+    product_cards.copy_name(instance, deleted=True)
@@ -1,3 +1,403 @@
-from django.test import TestCase
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+import uuid
 
-# Create your tests here.
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import close_old_connections, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ecommerce_app import images, metrics
+from ecommerce_app.authentication import CachedJWTAuthentication
+from ecommerce_app.benchmark import seed_dataset
+from ecommerce_app.conditional import catalog_validators, product_sources
+from ecommerce_app.file_serving import serve_file
+from ecommerce_app.guest_cart import CacheGuestCartStore, DatabaseGuestCartStore, GuestCartBusy, InMemoryGuestCartStore, get_guest_cart_store
+from ecommerce_app.management.commands.check_query_plans import BOUNDED_SCANS, QUERY_PLANS, Command as CheckQueryPlans, full_scans
+from ecommerce_app.models.admin import Brand, Category, Product, ProductImage
+from ecommerce_app.models.user import Address, Cart, ProductPurchase, StockReservation, User
+from ecommerce_app.passwords import HashingUnavailable, get_password_pool, hash_password, verify_password
+from ecommerce_app.product_cards import refresh_queryset
+from ecommerce_app.reservations import InsufficientStock, expire_stale_holds, hold_stock
+from ecommerce_app.serializers.read import ProductReadSerializer
+from ecommerce_app.utils import ORDER_STATUS, RESERVATION_STATUS
+from ecommerce_app.views.admin import ProductDetailView, ProductListCreateView
+from ecommerce_app.views.user import CartViewSet, ProductPurchaseViewSet, login
+from ecommerce_app.workers import BoundedProcessPool, WorkerPoolBusy
+
+
+def make_user(email='shopper@example.com', **kwargs):
+    return User.objects.create_user(email, 'password', first_name='Shopper', **kwargs)
+
+
+def make_product(name='Product', stock=10, **kwargs):
+    brand = Brand.objects.get_or_create(name='Brand')[0]
+    category = Category.objects.get_or_create(name='Category')[0]
+    return Product.objects.create(name=name, brand=brand, category=category, price='10.00', stock=stock, **kwargs)
+
+
+def run_concurrently(target, count):
+    """
+    Run `target(index)` In `count` Threads Released Together, Returns What Each Returned Or Raised
+    * Every thread has its own database connection, closed when it is done
+    """
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(index):
+        try:
+            barrier.wait()
+            results[index] = target(index)
+        except Exception as exc:
+            results[index] = exc
+        finally:
+            close_old_connections()
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class StockReservationTests(TransactionTestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.address = Address.objects.create(user=self.user, name='Home', phone=9000000000, pincode='560001', locality='Locality', city='City', state='State')
+
+    def order(self, product, quantity=1):
+        purchase = ProductPurchase.objects.create(user=self.user, address=self.address, Product=product, product_price=product.price, quantity=quantity)
+        hold_stock(self.user, {product.id: quantity}, {product.id: purchase})
+        return purchase
+
+    def pay(self, purchase):
+        request = APIRequestFactory().patch('/', {'payment_status': True}, format='json')
+        force_authenticate(request, user=self.user)
+        return ProductPurchaseViewSet.as_view({'patch': 'partial_update'})(request, pk=purchase.pk)
+
+    def test_concurrent_holds_never_oversell(self):
+        product = make_product(stock=5)
+
+        results = run_concurrently(lambda index: hold_stock(self.user, {product.id: 1}), 12)
+
+        self.assertEqual(sum(1 for result in results if isinstance(result, list)), 5)
+        self.assertTrue(all(isinstance(result, (list, InsufficientStock)) for result in results), results)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(StockReservation.objects.filter(product=product).count(), 5)
+
+    def test_expired_hold_cancels_its_purchase_and_refuses_payment(self):
+        product = make_product(stock=3)
+        purchase = self.order(product, quantity=2)
+
+        self.assertEqual(expire_stale_holds(now=timezone.now() + timedelta(days=1)), 1)
+        response = self.pay(purchase)
+
+        self.assertEqual(response.status_code, 400)
+        purchase.refresh_from_db()
+        product.refresh_from_db()
+        self.assertFalse(purchase.payment_status)
+        self.assertEqual(purchase.order_status, ORDER_STATUS[4][0])
+        self.assertEqual(product.stock, 3)
+
+    def test_holds_and_releases_change_the_product_validators(self):
+        product = make_product(stock=3)
+        request = APIRequestFactory().get(f'/products/{product.pk}/')
+        validators = [catalog_validators(request, product_sources(request, product.pk))]
+
+        self.order(product)
+        validators.append(catalog_validators(request, product_sources(request, product.pk)))
+        expire_stale_holds(now=timezone.now() + timedelta(days=1))
+        validators.append(catalog_validators(request, product_sources(request, product.pk)))
+
+        self.assertEqual(len({etag for etag, _ in validators}), 3, validators)
+
+    def test_payment_racing_expiry_never_sells_released_stock(self):
+        for attempt in range(5):
+            product = make_product(name=f'Product {attempt}', stock=1)
+            purchase = self.order(product)
+            later = timezone.now() + timedelta(days=1)
+
+            run_concurrently(lambda index: self.pay(purchase) if index == 0 else expire_stale_holds(now=later), 2)
+
+            purchase.refresh_from_db()
+            product.refresh_from_db()
+            reservation = StockReservation.objects.get(purchase=purchase)
+            if purchase.payment_status:
+                # Paid first, the hold is confirmed & the stock stays sold
+                self.assertEqual(reservation.reservation_status, RESERVATION_STATUS[1][0])
+                self.assertEqual(product.stock, 0)
+            else:
+                # Expired first, the stock is back on sale & the purchase is cancelled
+                self.assertEqual(reservation.reservation_status, RESERVATION_STATUS[3][0])
+                self.assertEqual(purchase.order_status, ORDER_STATUS[4][0])
+                self.assertEqual(product.stock, 1)
+
+
+class CartConcurrencyTests(TransactionTestCase):
+    def add_to_cart(self, user, product, quantity):
+        request = APIRequestFactory().post('/', {'user': str(user.id), 'product': str(product.id), 'quantity': quantity}, format='json')
+        force_authenticate(request, user=user)
+        return CartViewSet.as_view({'post': 'create'})(request)
+
+    def test_parallel_adds_end_in_one_line_with_the_summed_quantity(self):
+        user = make_user()
+        product = make_product(stock=100)
+
+        responses = run_concurrently(lambda index: self.add_to_cart(user, product, 2), 8)
+
+        self.assertEqual([response.status_code for response in responses], [201] * 8)
+        lines = Cart.objects.filter(user=user, product=product, status=1)
+        self.assertEqual(list(lines.values_list('quantity', flat=True)), [16])
+
+    def test_parallel_guest_cart_adds_keep_every_quantity(self):
+        product_ids = [uuid.uuid4() for _ in range(3)]
+        for store in (DatabaseGuestCartStore(), CacheGuestCartStore(), InMemoryGuestCartStore()):
+            with self.subTest(store=type(store).__name__):
+                cart_id = str(uuid.uuid4())
+
+                def add(index):
+                    for _ in range(20):
+                        store.add(cart_id, product_ids[index % 3], 1)
+
+                run_concurrently(add, 12)
+
+                self.assertEqual(store.quantities(cart_id), {product_id: 80 for product_id in product_ids})
+                store.clear(cart_id)
+
+    def test_cart_lock_is_only_released_by_its_holder(self):
+        store = CacheGuestCartStore()
+        key = 'guest_cart_lock:lapsed'
+        with store.locked('lapsed'):
+            # The lock timed out & the next holder took it
+            store.cache.set(key, 'next holder')
+        self.assertEqual(store.cache.get(key), 'next holder')
+        store.cache.delete(key)
+
+    @override_settings(GUEST_CART_STORE='ecommerce_app.guest_cart.CacheGuestCartStore')
+    def test_cache_store_refuses_a_process_local_cache(self):
+        get_guest_cart_store.cache_clear()
+        self.addCleanup(get_guest_cart_store.cache_clear)
+        with self.assertRaises(ImproperlyConfigured):
+            get_guest_cart_store()
+        with override_settings(DEBUG=True):
+            self.assertIsInstance(get_guest_cart_store(), CacheGuestCartStore)
+
+    def test_login_with_a_locked_guest_cart_keeps_the_cart_for_later(self):
+        user = make_user()
+        request = APIRequestFactory().post('/login/', {'email': user.email, 'password': 'password'}, format='json')
+        request.session = {'cart_id': 'locked-cart'}
+        store = mock.Mock(locked=mock.Mock(side_effect=GuestCartBusy()))
+        with mock.patch('ecommerce_app.signals.get_guest_cart_store', return_value=store), \
+                mock.patch('ecommerce_app.views.user.verify_password', return_value=(True, None)), \
+                self.assertLogs('ecommerce_app.signals', 'WARNING'):
+            response = login(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(request.session, {'cart_id': 'locked-cart'})
+
+
+class ProductQueryBudgetTests(TestCase):
+    """
+    The Product List & Detail Query Budgets Stated On The Views, Whatever The Page Size
+    """
+    @classmethod
+    def setUpTestData(cls):
+        brand, category = Brand.objects.create(name='Brand'), Category.objects.create(name='Category')
+        products = Product.objects.bulk_create([
+            Product(name=f'Product {index}', brand=brand, category=category, price='10.00', stock=5) for index in range(120)
+        ])
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=f'product_images/{product.id.hex}-{position}.jpg')
+            for product in products for position in range(2)
+        ])
+        cls.product = products[0]
+
+    def list_products(self, query):
+        return ProductListCreateView().list_products(Request(APIRequestFactory().get(f'/products/{query}')))
+
+    def test_product_list_runs_three_queries_at_any_page_size(self):
+        for page_size in (10, 100):
+            with self.subTest(page_size=page_size), self.assertNumQueries(3):
+                data = self.list_products(f'?page_size={page_size}')
+            self.assertEqual(len(data['results']['data']), page_size)
+            self.assertTrue(all(len(product['images']) == 2 for product in data['results']['data']))
+
+    def test_product_list_cursor_pages_skip_the_count(self):
+        with self.assertNumQueries(2):
+            data = self.list_products('?cursor=&page_size=100')
+        self.assertEqual(len(data['results']['data']), 100)
+
+    def test_product_detail_runs_two_queries(self):
+        with self.assertNumQueries(2):
+            data = ProductDetailView().serialize_product(self.product.pk)
+        self.assertEqual(len(data['images']), 2)
+
+
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN Of Every Endpoint's Main Query On A Seeded Catalog, None May Read A Whole Table
+    """
+    @classmethod
+    def setUpTestData(cls):
+        CheckQueryPlans(stdout=io.StringIO()).seed(2000)
+
+    def test_no_endpoint_query_reads_a_whole_table(self):
+        sample = CheckQueryPlans().sample()
+        for name, build in QUERY_PLANS.items():
+            with self.subTest(name):
+                plan = build(sample).explain()
+                self.assertEqual(full_scans(plan, connection.vendor, bounded=name in BOUNDED_SCANS), [], plan)
+
+
+class ReadSerializerParityTests(TestCase):
+    """
+    The Read Serializers Render Byte For Byte What The DRF Serializers They Stand In For Render
+    """
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(products=300, users=60, cart_users=5, cart_lines=10, guest_carts=2)
+        # Values the seed never produces: offer prices, image variants, a unicode name, a user with a profile image
+        product = Product.objects.filter(status=1).first()
+        Product.objects.filter(pk=product.pk).update(name='Caf\u00e9 \u2028 \U0001f600', offer_price='9.99')
+        variant = {'width': 320, 'height': 240, 'src': 'product_images/variants/a-small.jpg', 'webp': 'product_images/variants/a-small.webp'}
+        ProductImage.objects.filter(product=product).update(variants={'small': variant})
+        User.objects.filter(pk=User.objects.filter(status=1).first().pk).update(profile_image='media/profile_image/a.png', user_currency='rupee')
+        refresh_queryset(Product.objects.order_by())
+
+    def test_read_serializers_match_the_drf_serializers(self):
+        output = io.StringIO()
+        call_command('check_read_serializers', pages=3, rounds=0, stdout=output)
+        for name in ('product_list', 'product_card_list', 'user_list', 'cart_list', 'guest_cart_list'):
+            self.assertIn(f'ok {name}', output.getvalue())
+
+    def test_read_serializers_count_as_serializer_time(self):
+        metrics.install()
+        request_metrics = metrics.RequestMetrics()
+        token = metrics._current.set(request_metrics)
+        try:
+            started = time.perf_counter()
+            ProductReadSerializer().serialize(Product.objects.filter(status=1).order_by('-created_at', '-id')[:100])
+            elapsed = time.perf_counter() - started
+        finally:
+            metrics._current.reset(token)
+        # The nested image serializer is inside the product one, counted once
+        self.assertGreater(request_metrics.serializer, 0)
+        self.assertLessEqual(request_metrics.serializer, elapsed)
+        self.assertEqual(request_metrics.timing, set())
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.token = AccessToken.for_user(self.user)
+
+    def test_process_local_cache_loads_the_user_every_time(self):
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                user = CachedJWTAuthentication().get_user(self.token)
+        self.assertEqual(user.get_deferred_fields(), set())
+
+    def test_shared_cache_serves_the_snapshot_until_the_user_is_saved(self):
+        with tempfile.TemporaryDirectory() as location:
+            shared = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+            with override_settings(CACHES={**settings.CACHES, settings.AUTH_USER_CACHE_ALIAS: shared}):
+                with self.assertNumQueries(1):
+                    CachedJWTAuthentication().get_user(self.token)
+                with self.assertNumQueries(0):
+                    user = CachedJWTAuthentication().get_user(self.token)
+                    self.assertEqual((user.email, user.first_name, user.status), (self.user.email, 'Shopper', 1))
+                self.assertEqual(user.get_deferred_fields(), {'password'})
+
+                self.user.first_name = 'Renamed'
+                self.user.save()
+                with self.assertNumQueries(1):
+                    self.assertEqual(CachedJWTAuthentication().get_user(self.token).first_name, 'Renamed')
+
+
+class BoundedProcessPoolTests(TestCase):
+    def test_timed_out_call_keeps_its_slot_until_it_finishes(self):
+        pool = BoundedProcessPool(max_workers=1, max_pending=0)
+        self.addCleanup(pool.shutdown)
+        self.assertEqual(pool.run(abs, -1, timeout=30), 1)  # Pool started
+
+        with self.assertRaises(WorkerPoolBusy):
+            pool.run(time.sleep, 1, timeout=0.1)
+        # The sleep is still running in the only process, a second call is turned away
+        with self.assertRaises(WorkerPoolBusy):
+            pool.run(abs, -2, timeout=30)
+
+        time.sleep(1.5)
+        self.assertEqual(pool.run(abs, -3, timeout=30), 3)
+
+    def test_broken_pool_leaves_the_image_for_the_backfill(self):
+        with mock.patch.object(images.get_image_pool(), 'submit', side_effect=BrokenProcessPool('worker died')), \
+                self.assertLogs('ecommerce_app.images', 'WARNING'):
+            self.assertFalse(images.queue_variants(uuid.uuid4(), 'product_images/a.jpg'))
+
+
+class PasswordHashingTests(TestCase):
+    @override_settings(PASSWORD_HASH_WORKERS=0)
+    def test_no_workers_hashes_in_the_request_thread(self):
+        with mock.patch('ecommerce_app.passwords.get_password_pool') as get_pool:
+            encoded = hash_password('secret')
+            self.assertEqual(verify_password('secret', encoded), (True, None))
+        get_pool.assert_not_called()
+
+    def test_unavailable_pool_is_a_503(self):
+        for error in (BrokenProcessPool('worker died'), OSError(38, 'Function not implemented')):
+            with self.subTest(error=error), mock.patch.object(get_password_pool(), 'run', side_effect=error), \
+                    self.assertLogs('ecommerce_app.passwords', 'ERROR'), self.assertRaises(HashingUnavailable):
+                hash_password('secret')
+
+
+class BrandSearchIndexTests(TestCase):
+    def test_only_a_rename_reindexes_the_brand_products(self):
+        product = make_product()
+        brand = product.brand
+        with mock.patch('ecommerce_app.signals.search.index_queryset') as index_queryset:
+            with self.captureOnCommitCallbacks(execute=True):
+                brand.status = 0
+                brand.save()
+            index_queryset.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                brand.name = 'Renamed'
+                brand.save()
+            index_queryset.assert_called_once()
+            self.assertEqual(list(index_queryset.call_args.args[1]), [product])
+
+
+class FileServingAccelTests(TestCase):
+    def serve(self, name, accel):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        with open(os.path.join(root, name), 'wb') as file:
+            file.write(b'image')
+        with override_settings(FILE_SERVING_ACCEL=accel):
+            return serve_file(APIRequestFactory().get('/'), name, root, '/internal/media/', 'public')
+
+    def test_accel_redirect_is_percent_encoded(self):
+        response = self.serve('caf\u00e9 50% off?#1.jpg', 'x-accel-redirect')
+        self.assertEqual(response['X-Accel-Redirect'], '/internal/media/caf%C3%A9%2050%25%20off%3F%231.jpg')
+
+    def test_sendfile_serves_non_latin_1_names_itself(self):
+        response = self.serve('caf\u00e9.jpg', 'x-sendfile')
+        self.assertTrue(response['X-Sendfile'].endswith('caf\u00e9.jpg'))
+
+        response = self.serve('\u5546\u54c1.jpg', 'x-sendfile')
+        self.assertNotIn('X-Sendfile', response)
+        self.assertEqual(b''.join(response.streaming_content), b'image')
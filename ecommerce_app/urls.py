@@ -4,6 +4,8 @@ from rest_framework.routers import DefaultRouter
 
 from ecommerce_app.views.user import *
 from ecommerce_app.views.admin import *
+from ecommerce_app.views import async_catalog
+from ecommerce_app.metrics import metrics_view
 
 router = DefaultRouter()
 router.register(r'carts', CartViewSet, basename='cart')
@@ -18,6 +20,9 @@ urlpatterns = [
     path('update_user/<uuid:user_id>/', update_user, name= 'update_user'),
     path('delete_user/<uuid:user_id>/', delete_user, name= 'delete_user'),
 
+    # Order export
+    path('orders/export/', export_orders, name='export_orders'),
+
     # admin views
     # Brand API's
     path('brands/', BrandListCreateView.as_view(), name='brand_list_create'),
@@ -30,7 +35,20 @@ urlpatterns = [
     # Product API's
     path('products/', ProductListCreateView.as_view(), name='product_list_create'),
     path('products/<uuid:pk>/', ProductDetailView.as_view(), name='product_detail'),
+    path('products/availability/', product_availability, name='product_availability'),
+    path('products/cards/', product_card_list, name='product_card_list'),
+    path('products/import/', ProductImportView.as_view(), name='product_import'),
 
     # Cart API
     path('', include(router.urls)),
+
+    # Async read API's, for ASGI deployments
+    path('async/products/', async_catalog.product_list, name='async_product_list'),
+    path('async/products/<uuid:pk>/', async_catalog.product_detail, name='async_product_detail'),
+    path('async/categories/', async_catalog.category_list, name='async_category_list'),
+    path('async/categories/<uuid:pk>/', async_catalog.category_detail, name='async_category_detail'),
+    path('async/carts/', async_catalog.cart_list, name='async_cart_list'),
+
+    # Prometheus metrics
+    path('metrics/', metrics_view, name='metrics'),
 ]
@@ -21,4 +21,11 @@ ORDER_STATUS = (
 ADDRESS_TYPES = (
     (0, 'Home'),
     (1, 'Work'),
-)
\ No newline at end of file
+)
+
+RESERVATION_STATUS = (
+    (0, 'HELD'),
+    (1, 'CONFIRMED'),
+    (2, 'RELEASED'),
+    (3, 'EXPIRED'),
+)
@@ -1,3 +1,5 @@
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -5,8 +7,14 @@ from rest_framework.permissions import IsAuthenticated
 
 from ecommerce_app.models.admin import Brand, Category, Product, ProductImage
 from ecommerce_app.serializers.admin import BrandSerializer, CategorySerializer, ProductSerializer
+from ecommerce_app.serializers.read import ProductReadSerializer
 from ecommerce_app.utils import STATUS_CHOICES
-from ecommerce_app.pagination import StandardResultsSetPagination
+from ecommerce_app.pagination import get_paginator
+from ecommerce_app.helper import attach_active_images, build_category_tree
+from ecommerce_app.cache import get_or_set_catalog_entry
+from ecommerce_app.conditional import brand_sources, category_sources, conditional_catalog_get, product_sources
+from ecommerce_app.search import search_queryset
+from ecommerce_app.product_import import IMPORT_FORMATS, import_format, import_report
 from permission import IsUserActive, IsSuperUser
 
 # Brand API's
@@ -25,16 +33,17 @@ class BrandListCreateView(generics.ListCreateAPIView):
         search_query = self.request.query_params.get('search', None)
         
         if search_query:
-            queryset = queryset.filter(name__icontains=search_query)  # Filter based on case-insensitive match
+            queryset = search_queryset(queryset, 'brand', search_query)  # Ranked prefix match on the search index
         
         return queryset
 
+    @method_decorator(conditional_catalog_get(brand_sources))
     def list(self, request, *args, **kwargs):
         """
         Get All Brands with search functionality
         """
         queryset = self.get_queryset()
-        paginator = StandardResultsSetPagination()
+        paginator = get_paginator(request)
         paginated_queryset = paginator.paginate_queryset(queryset, request) 
         serializer = self.get_serializer(paginated_queryset, many=True)
         return paginator.get_paginated_response({'status': 'success', 'data': serializer.data})
@@ -55,6 +64,7 @@ class BrandRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Brand.objects.filter(status=STATUS_CHOICES[1][0])
     serializer_class = BrandSerializer
 
+    @method_decorator(conditional_catalog_get(brand_sources))
     def get(self, request, *args, **kwargs):
         """
         Get Single Brand
@@ -117,18 +127,19 @@ class CategoryListCreateView(generics.GenericAPIView):
         search_query = self.request.query_params.get('search', None)
         
         if search_query:
-            queryset = queryset.filter(name__icontains=search_query)  # Filter based on case-insensitive match
+            queryset = search_queryset(queryset, 'category', search_query)  # Ranked prefix match on the search index
         
         return queryset
 
+    @method_decorator(conditional_catalog_get(category_sources))
     def get(self, request, *args, **kwargs):
         """
         Get All Categories with search functionality
         """
         queryset = self.get_queryset()
-        paginator = StandardResultsSetPagination()
+        paginator = get_paginator(request)
         paginated_queryset = paginator.paginate_queryset(queryset, request) 
-        serializer = self.get_serializer(paginated_queryset, many=True)
+        serializer = self.get_serializer(build_category_tree(paginated_queryset), many=True)
         return paginator.get_paginated_response({'status': 'success', 'data': serializer.data})
 
     def post(self, request, *args, **kwargs):
@@ -146,6 +157,7 @@ class CategoryRetrieveUpdateDestroyView(generics.GenericAPIView):
     queryset = Category.objects.filter(status=STATUS_CHOICES[1][0])
     serializer_class = CategorySerializer
 
+    @method_decorator(conditional_catalog_get(category_sources))
     def get(self, request, *args, **kwargs):
         """
         Get Category
@@ -154,6 +166,7 @@ class CategoryRetrieveUpdateDestroyView(generics.GenericAPIView):
             instance = self.get_object()
         except:
             return Response({'status': 'error', 'data': 'Category not found'}, status=status.HTTP_400_BAD_REQUEST)
+        build_category_tree([instance])
         serializer = self.get_serializer(instance)
         return Response({'status': 'error', 'data': serializer.data}, status=status.HTTP_200_OK)
 
@@ -198,18 +211,32 @@ class CategoryRetrieveUpdateDestroyView(generics.GenericAPIView):
 class ProductListCreateView(APIView):
     permission_classes = [IsAuthenticated, IsUserActive, IsSuperUser]
 
+    @method_decorator(conditional_catalog_get(product_sources))
     def get(self, request):
         """
         List all products along with their images.
+        * Served from the catalog cache, keyed by catalog version & full URL (page, page_size, search)
+        """
+        data = get_or_set_catalog_entry(('product_list', request.build_absolute_uri()), lambda: self.list_products(request))
+        return Response(data)
+
+    def list_products(self, request):
+        """
+        Serialize one page of active products, narrowed & ranked by the `search` query param when given
+        * Runs a fixed 3 queries whatever the page size: count, page and one batch for the page's images
+        * Rows are read with .values() & serialized by ProductReadSerializer, the same output as ProductSerializer
         """
         products = Product.objects.filter(status=STATUS_CHOICES[1][0])  # Only active products
-        paginator = StandardResultsSetPagination()
-        paginated_products = paginator.paginate_queryset(products, request)
-        serializer = ProductSerializer(paginated_products, many=True)
+        search_query = request.query_params.get('search', None)
+        if search_query:
+            products = search_queryset(products, 'product', search_query)
+        serializer = ProductReadSerializer()
+        paginator = get_paginator(request)
+        paginated_products = paginator.paginate_queryset(serializer.values(products), request)
         return paginator.get_paginated_response({
             'status': 'success', 
-            'data': serializer.data
-        })
+            'data': serializer.serialize(paginated_products)
+        }).data
 
     def post(self, request):
         """
@@ -239,23 +266,31 @@ class ProductDetailView(APIView):
         except Product.DoesNotExist:
             return None
 
+    @method_decorator(conditional_catalog_get(product_sources))
     def get(self, request, pk):
         """
         Retrieve a product by its ID.
+        * Served from the catalog cache, otherwise runs a fixed 2 queries: the product and one batch for its images
         """
-        product = self.get_object(pk)
-        if not product:
+        data = get_or_set_catalog_entry(('product_detail', pk), lambda: self.serialize_product(pk))
+        if not data:
             return Response({
                 'status': 'error', 
                 'data': 'Product not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        serializer = ProductSerializer(product)
         return Response({
             'status': 'success',
-            'data': serializer.data
+            'data': data
         }, status=status.HTTP_200_OK)
 
+    def serialize_product(self, pk):
+        product = self.get_object(pk)
+        if not product:
+            return None
+        attach_active_images([product])
+        return ProductSerializer(product).data
+
     def put(self, request, pk):
         """
         Update a product and its images using the full update (PUT).
@@ -345,4 +380,25 @@ class ProductDetailView(APIView):
         return Response({
             'status': 'success',
             'data': 'Product image deleted successfully'
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+
+class ProductImportView(APIView):
+    permission_classes = [IsAuthenticated, IsUserActive, IsSuperUser]
+
+    def post(self, request):
+        """
+        Bulk Import Products From An Uploaded CSV Or NDJSON `file`
+        * Brands & categories by name, see ecommerce_app/product_import.py for the columns
+        * The format comes from the `format` field or the file name
+        * Streams an NDJSON report while importing: one line per rejected row, then the summary
+        """
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'status': 'validation_error', 'data': {'file': ['A CSV or NDJSON file is required.']}}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_format = request.data.get('format') or import_format(upload.name, upload.content_type)
+        if file_format not in IMPORT_FORMATS:
+            return Response({'status': 'validation_error', 'data': {'format': [f"Format must be one of {', '.join(IMPORT_FORMATS)}."]}}, status=status.HTTP_400_BAD_REQUEST)
+
+        return StreamingHttpResponse(import_report(upload.file, file_format), content_type='application/x-ndjson')
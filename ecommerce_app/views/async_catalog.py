@@ -0,0 +1,163 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, MethodNotAllowed, NotAuthenticated
+from rest_framework.request import Request
+
+from ecommerce_app.authentication import CachedJWTAuthentication
+from ecommerce_app.cache import aget_or_set_catalog_entry
+from ecommerce_app.conditional import category_sources, conditional_catalog_get, product_sources
+from ecommerce_app.helper import aattach_active_images, abuild_category_tree
+from ecommerce_app.models.admin import Category, Product
+from ecommerce_app.models.user import Cart
+from ecommerce_app.pagination import get_paginator
+from ecommerce_app.renderers import FastJSONRenderer
+from ecommerce_app.search import search_queryset
+from ecommerce_app.serializers.admin import CategorySerializer, ProductSerializer
+from ecommerce_app.serializers.user import CartSerializer
+from ecommerce_app.utils import STATUS_CHOICES
+from permission import IsUserActive, IsSuperUser
+
+# Async Read API's
+# * Native async views for the hot catalog & cart reads, so under ASGI a request waiting on the database doesn't hold a worker thread
+# * Same responses as the DRF views they mirror, DRF views stay sync so authentication & permissions are run here
+# * Serializers only ever see rows loaded up front (active_images, active_children, ...), any lazy query would raise SynchronousOnlyOperation
+
+
+def api_response(data, status=status.HTTP_200_OK, headers=None):
+    return HttpResponse(FastJSONRenderer().render(data), status=status, headers=headers, content_type='application/json')
+
+
+def async_api_view(*permission_classes):
+    """
+    Authenticate & Check Permissions For An Async GET View The Way The DRF Views Do
+    * The view gets a DRF Request, so query_params & the paginators work as in the sync views
+    * API exceptions, from the checks or the view, are answered with the same status codes & bodies as DRF's exception handler
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(http_request, *args, **kwargs):
+            request = Request(http_request, authenticators=[])
+            authentication = CachedJWTAuthentication()
+            try:
+                if request.method != 'GET':
+                    raise MethodNotAllowed(request.method)
+
+                user_auth = await authentication.aauthenticate(request)
+                if user_auth is None:
+                    raise NotAuthenticated()
+                request.user = user_auth[0]
+
+                for permission in permission_classes:
+                    permission().has_permission(request, view)
+
+                return await view(request, *args, **kwargs)
+            except APIException as exc:
+                headers = {}
+                if isinstance(exc, NotAuthenticated) or exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                    exc.status_code = status.HTTP_401_UNAUTHORIZED
+                    headers['WWW-Authenticate'] = authentication.authenticate_header(request)
+                data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+                return api_response(data, status=exc.status_code, headers=headers)
+        return wrapper
+    return decorator
+
+
+async def paginate(queryset, request):
+    paginator = get_paginator(request)
+    return paginator, await paginator.apaginate_queryset(queryset, request)
+
+
+# Product API's
+@async_api_view(IsUserActive, IsSuperUser)
+@conditional_catalog_get(product_sources)
+async def product_list(request):
+    """
+    Async Product List, Same Catalog Cache Entries As ProductListCreateView
+    """
+    async def list_products():
+        products = Product.objects.filter(status=STATUS_CHOICES[1][0])  # Only active products
+        search_query = request.query_params.get('search', None)
+        if search_query:
+            products = await sync_to_async(search_queryset)(products, 'product', search_query)
+        paginator, paginated_products = await paginate(products, request)
+        serializer = ProductSerializer(await aattach_active_images(paginated_products), many=True)
+        return paginator.get_paginated_response({
+            'status': 'success',
+            'data': serializer.data
+        }).data
+
+    data = await aget_or_set_catalog_entry(('product_list', request.build_absolute_uri()), list_products)
+    return api_response(data)
+
+
+@async_api_view(IsUserActive, IsSuperUser)
+@conditional_catalog_get(product_sources)
+async def product_detail(request, pk):
+    """
+    Async Product Detail, Same Catalog Cache Entries As ProductDetailView
+    """
+    async def serialize_product():
+        try:
+            product = await Product.objects.aget(pk=pk, status=STATUS_CHOICES[1][0])
+        except Product.DoesNotExist:
+            return None
+        await aattach_active_images([product])
+        return ProductSerializer(product).data
+
+    data = await aget_or_set_catalog_entry(('product_detail', pk), serialize_product)
+    if not data:
+        return api_response({
+            'status': 'error',
+            'data': 'Product not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    return api_response({
+        'status': 'success',
+        'data': data
+    })
+
+
+# Category API's
+@async_api_view(IsUserActive, IsSuperUser)
+@conditional_catalog_get(category_sources)
+async def category_list(request):
+    """
+    Async Category Tree, One Page Of Categories With Their Active Sub Tree & Products
+    """
+    queryset = Category.objects.filter(status=STATUS_CHOICES[1][0])
+    search_query = request.query_params.get('search', None)
+    if search_query:
+        queryset = await sync_to_async(search_queryset)(queryset, 'category', search_query)
+
+    paginator, paginated_queryset = await paginate(queryset, request)
+    serializer = CategorySerializer(await abuild_category_tree(paginated_queryset), many=True)
+    return api_response(paginator.get_paginated_response({'status': 'success', 'data': serializer.data}).data)
+
+
+@async_api_view(IsUserActive, IsSuperUser)
+@conditional_catalog_get(category_sources)
+async def category_detail(request, pk):
+    """
+    Async Category With Its Active Sub Tree & Products
+    """
+    try:
+        instance = await Category.objects.aget(pk=pk, status=STATUS_CHOICES[1][0])
+    except Category.DoesNotExist:
+        return api_response({'status': 'error', 'data': 'Category not found'}, status=status.HTTP_400_BAD_REQUEST)
+    await abuild_category_tree([instance])
+    serializer = CategorySerializer(instance)
+    return api_response({'status': 'error', 'data': serializer.data})
+
+
+# Cart API
+@async_api_view(IsUserActive)
+async def cart_list(request):
+    """
+    Async Cart List Of The Authenticated User
+    """
+    cart = [item async for item in Cart.objects.filter(user_id=request.user.id, status=STATUS_CHOICES[1][0])]
+    serializer = CartSerializer(cart, many=True)
+    return api_response({'status': 'success', 'data': serializer.data})
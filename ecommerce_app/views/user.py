@@ -5,16 +5,24 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 
 from django.contrib.auth.signals import user_logged_in
-from django.contrib.auth import authenticate
-from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.db.models import Q, F, Sum
 from django.db import transaction
 
-from ecommerce_app.serializers.user import UserSerializer, AddressSerializer, CartSerializer, ProductPurchaseSerializer
-from ecommerce_app.models.admin import Product
-from ecommerce_app.models.user import User, Address, Cart, ProductPurchase
-from ecommerce_app.utils import STATUS_CHOICES, ORDER_STATUS
+import uuid
+
+from ecommerce_app.serializers.user import UserSerializer, AddressSerializer, CartSerializer, ProductPurchaseSerializer, OrderExportSerializer
+from ecommerce_app.serializers.read import CartReadSerializer, ProductCardReadSerializer, UserReadSerializer
+from ecommerce_app.models.admin import Product, ProductCard
+from ecommerce_app.models.user import User, Address, Cart, ProductPurchase, StockReservation
+from ecommerce_app.utils import STATUS_CHOICES, ORDER_STATUS, RESERVATION_STATUS
 from ecommerce_app.helper import create_jwt_token_for_user, CartMixin
-from ecommerce_app.pagination import StandardResultsSetPagination
+from ecommerce_app.pagination import get_paginator
+from ecommerce_app.conditional import conditional_catalog_get, product_card_sources
+from ecommerce_app.order_export import EXPORTERS, export_queryset
+from ecommerce_app.passwords import verify_password
+from ecommerce_app.reservations import hold_stock, confirm_holds, release_holds, lock_rows, InsufficientStock
 from permission import IsUserActive, IsSuperUser
 # Create your views here.
 
@@ -57,27 +65,26 @@ def login(request):
             {"status": "validation_error", "data": errors},
             status=status.HTTP_400_BAD_REQUEST)
 
-    user = authenticate(email=email, password=password)
-        
-    if user:
-        if user.status == STATUS_CHOICES[1][0]:
-                user_logged_in.send(sender=user.__class__, request=request, user=user)
-                token = create_jwt_token_for_user(user)
-                return Response({"status": "success", "data": {"msg": "User LoggedIn Successfully.", "token": token['access_token'], 'email' : user.email}}, status=status.HTTP_200_OK)
-        elif user.status == STATUS_CHOICES[4][0]:
-           return Response({"status": "validation_error", "data": {"email": ["You don't have access to the application. Verify your email to continue."] }}, status=status.HTTP_401_UNAUTHORIZED)
-        else :
-            return Response({"status": "validation_error", "data": {"email": ["You don't have access to the application. Please contact admin."] }}, status=status.HTTP_400_BAD_REQUEST)  
-    else:
-        user = User.objects.filter(email = email).first()
-        if user:
-            if user.status == STATUS_CHOICES[1][0]:
-                return Response({'status': 'validation_error', 'data': {"email": ["Invalid Credentials."]}}, status=status.HTTP_400_BAD_REQUEST)
-            else:
-                return Response({'status': 'validation_error', 'data': {"email": ["You don't have access to the application. Please contact admin"]}}, status=status.HTTP_400_BAD_REQUEST)
+    # One lookup, the password is only checked (in the password pool) for users allowed to log in
+    user = User.objects.filter(email=email).first()
+    if not user:
+        return Response({"status": "validation_error", "data": {"email": ["Please Register and Login."] }}, status=status.HTTP_400_BAD_REQUEST)
 
-        else:
-            return Response({"status": "validation_error", "data": {"email": ["Please Register and Login."] }}, status=status.HTTP_400_BAD_REQUEST)
+    if user.status != STATUS_CHOICES[1][0]:
+        return Response({'status': 'validation_error', 'data': {"email": ["You don't have access to the application. Please contact admin"]}}, status=status.HTTP_400_BAD_REQUEST)
+
+    valid, rehashed = verify_password(password, user.password)
+    if not valid:
+        return Response({'status': 'validation_error', 'data': {"email": ["Invalid Credentials."]}}, status=status.HTTP_400_BAD_REQUEST)
+
+    if rehashed:
+        # Stored with outdated hasher settings, keep the upgraded hash like authenticate() would
+        user.password = rehashed
+        user.save(update_fields=['password'])
+
+    user_logged_in.send(sender=user.__class__, request=request, user=user)
+    token = create_jwt_token_for_user(user)
+    return Response({"status": "success", "data": {"msg": "User LoggedIn Successfully.", "token": token['access_token'], 'email' : user.email}}, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsUserActive, IsSuperUser])
@@ -86,10 +93,10 @@ def user_list(request):
     Get All Users
     """
     users = User.objects.filter(status=STATUS_CHOICES[1][0]).order_by('-created_at')
-    paginator = StandardResultsSetPagination()
-    paginated_user = paginator.paginate_queryset(users, request) 
-    user_serializer = UserSerializer(paginated_user, many = True)
-    return paginator.get_paginated_response({'status': 'success', 'data': user_serializer.data})
+    paginator = get_paginator(request)
+    user_serializer = UserReadSerializer()
+    paginated_user = paginator.paginate_queryset(user_serializer.values(users), request)
+    return paginator.get_paginated_response({'status': 'success', 'data': user_serializer.serialize(paginated_user)})
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsUserActive])
@@ -133,6 +140,63 @@ def delete_user(request, user_id):
     return Response({'status': 'User deleted successfully'}, status= status.HTTP_200_OK)
 
 
+# Product Availability
+MAX_AVAILABILITY_PRODUCTS = 500
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsUserActive])
+def product_availability(request):
+    """
+    Stock Of Many Products In One Query, For Storefront Stock Badges
+    * Accepts up to 500 product ids as `product_ids`
+    * Unknown or inactive products come back with `available_stock` null
+    """
+    product_ids = request.data.get('product_ids')
+    if not isinstance(product_ids, list) or not product_ids:
+        return Response({'status': 'validation_error', 'data': {'product_ids': ['A non-empty list of product ids is required.']}}, status=status.HTTP_400_BAD_REQUEST)
+    if len(product_ids) > MAX_AVAILABILITY_PRODUCTS:
+        return Response({'status': 'validation_error', 'data': {'product_ids': [f'At most {MAX_AVAILABILITY_PRODUCTS} product ids are allowed.']}}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        product_ids = [uuid.UUID(str(product_id)) for product_id in product_ids]
+    except ValueError:
+        return Response({'status': 'validation_error', 'data': {'product_ids': ['Invalid product id.']}}, status=status.HTTP_400_BAD_REQUEST)
+
+    stock = dict(Product.objects.filter(id__in=product_ids, status=STATUS_CHOICES[1][0]).values_list('id', 'stock'))
+    data = [
+        {
+            'product_id': product_id,
+            'available_stock': stock.get(product_id),
+            'in_stock': stock.get(product_id, 0) > 0,
+        }
+        for product_id in dict.fromkeys(product_ids)
+    ]
+    return Response({'status': 'success', 'data': data}, status=status.HTTP_200_OK)
+
+
+# Product Cards
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsUserActive])
+@conditional_catalog_get(product_card_sources)
+def product_card_list(request):
+    """
+    Storefront Product Cards, Newest First, Optionally Only One `brand` Or `category` (Ids)
+    * One indexed scan of the ProductCard read table, no joins & no image queries, see ecommerce_app/product_cards.py
+    """
+    cards = ProductCard.objects.order_by('-created_at', '-id')
+    for field in ('brand', 'category'):
+        value = request.query_params.get(field)
+        if value:
+            try:
+                cards = cards.filter(**{f'{field}_id': uuid.UUID(value)})
+            except ValueError:
+                return Response({'status': 'validation_error', 'data': {field: [f'Invalid {field} id.']}}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = ProductCardReadSerializer()
+    paginator = get_paginator(request)
+    paginated_cards = paginator.paginate_queryset(serializer.values(cards), request)
+    return paginator.get_paginated_response({'status': 'success', 'data': serializer.serialize(paginated_cards)})
+
+
 # Address Views
 class AddressViewSet(viewsets.ModelViewSet):
     serializer_class = AddressSerializer
@@ -322,8 +386,26 @@ class CartViewSet(CartMixin, mixins.CreateModelMixin, mixins.UpdateModelMixin, m
 
     def list(self, request, *args, **kwargs):
         cart = self.get_cart(request)
-        serializer = CartSerializer(cart, many=True)
-        return Response({'status': 'success', 'data': serializer.data}, status=status.HTTP_200_OK)
+        return Response({'status': 'success', 'data': CartReadSerializer().serialize(cart)}, status=status.HTTP_200_OK)
+
+# Order Export
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsUserActive, IsSuperUser])
+def export_orders(request):
+    """
+    Stream Every Active Purchase With Its User, Address & Product As CSV Or NDJSON
+    * Filters: created_from, created_to, order_status & export_format query params, see OrderExportSerializer
+    * Rows are read in chunks & sent as they are encoded, the whole export is never in memory
+    """
+    filters = OrderExportSerializer(data=request.query_params)
+    if not filters.is_valid():
+        return Response({'status': 'validation_error', 'data': filters.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    export_format = filters.validated_data.pop('export_format')
+    exporter, content_type = EXPORTERS[export_format]
+    response = StreamingHttpResponse(exporter(export_queryset(**filters.validated_data)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="orders-{timezone.now():%Y%m%d%H%M%S}.{export_format}"'
+    return response
 
 # PurchaseProduct Views
 class ProductPurchaseViewSet(viewsets.ModelViewSet):
@@ -338,7 +420,7 @@ class ProductPurchaseViewSet(viewsets.ModelViewSet):
     
     def create(self, request, *args, **kwargs):
         user = request.user
-        cart_items = Cart.objects.filter(user=user)
+        cart_items = Cart.objects.filter(user=user, status=STATUS_CHOICES[1][0])
 
         # If a specific product is being purchased
         product_id = request.data.get('product_id')
@@ -369,28 +451,8 @@ class ProductPurchaseViewSet(viewsets.ModelViewSet):
         else:
             return Response({"status": "error", "data": "No products in cart."}, status=status.HTTP_400_BAD_REQUEST)
 
-    def _purchase_single_product(self, user, cart_item, quantity):
-        """Helper method to handle single product purchase (if in cart)."""
-        product_purchase_data = {
-            'user': user.id,
-            'product': cart_item.product.id,
-            'product_price': cart_item.product.price,  # Assuming product has a price field
-            'quantity': quantity,
-            'payment_status': True,  # Adjust payment logic as needed
-            'order_status': ORDER_STATUS[0][0],  # Default to 'ORDERED'
-        }
-
-        serializer = ProductPurchaseSerializer(data=product_purchase_data)
-        if serializer.is_valid():
-            serializer.save()
-        else:
-            return Response({'status': 'validation_error', 'data': serializer.errors})
-
-        # Remove the product from the cart after purchase
-        cart_item.delete()
-
     def _purchase_product_not_from_cart(self, user, address_id, product_id, quantity):
-        """Helper method to handle purchase when the product is not in the cart."""
+        """Helper method to handle purchase when the product is not in the cart, holding its stock until payment."""
         try:
             product = Product.objects.get(id=product_id)
         except Product.DoesNotExist:
@@ -409,32 +471,98 @@ class ProductPurchaseViewSet(viewsets.ModelViewSet):
 
         # Use the serializer to create the purchase
         serializer = ProductPurchaseSerializer(data=product_purchase_data)
-        if serializer.is_valid():
-            serializer.save()
-            product.stock - quantity
-            product.save()
-        else:
+        if not serializer.is_valid():
             return Response({'status': 'validation_error', 'data': serializer.errors})
 
+        try:
+            with transaction.atomic():
+                purchase = serializer.save()
+                hold_stock(user, {product.id: purchase.quantity}, {product.id: purchase})
+        except InsufficientStock:
+            return Response({"status": "error", "data": "Insufficient stock."}, status=status.HTTP_400_BAD_REQUEST)
+
         return Response({"detail": "Product purchased successfully."}, status=status.HTTP_201_CREATED)
 
     def _purchase_all_products(self, user, address_id, cart_items):
-        """Helper method to handle purchasing all products in the cart."""
+        """
+        Helper method to purchase the whole cart as one set based pipeline, in a fixed number of queries whatever the cart size.
+        * Lock the involved products & validate the stock of the whole cart in one query
+        * Create every purchase with one bulk insert
+        * Hold the stock with one conditional UPDATE and soft delete the cart rows in one statement
+        """
         with transaction.atomic():
-            for cart_item in cart_items:
-                self._purchase_single_product(user, address_id, cart_item, cart_item.quantity)
+            # Locking the cart lines first keeps a second checkout of the same cart waiting until this one is done
+            lock_rows(cart_items)
+            quantities = dict(
+                cart_items.filter(product__isnull=False)
+                .values('product_id').annotate(total=Sum('quantity'))
+                .values_list('product_id', 'total')
+            )
+            if not quantities:
+                # Every line lost its product, there is nothing left to buy
+                raise ValidationError({"status": "error", "message": "No products in cart."})
+            products = Product.objects.select_for_update().filter(id__in=quantities, status=STATUS_CHOICES[1][0]).in_bulk()
+
+            insufficient_stock_items = [
+                {
+                    "product_id": product_id,
+                    "requested_quantity": quantity,
+                    "available_stock": products[product_id].stock if product_id in products else 0
+                }
+                for product_id, quantity in quantities.items()
+                if product_id not in products or products[product_id].stock < quantity
+            ]
+            if insufficient_stock_items:
+                raise ValidationError({"status": "error", "message": "Some products have insufficient stock.", "data": insufficient_stock_items})
+
+            purchases = ProductPurchase.objects.bulk_create([
+                ProductPurchase(
+                    user=user,
+                    address_id=address_id,
+                    Product_id=product_id,
+                    product_price=products[product_id].price,
+                    quantity=quantity,
+                    payment_status=False,  # Stock stays on hold until the purchase is paid
+                    order_status=ORDER_STATUS[0][0],  # Default to 'ORDERED'
+                )
+                for product_id, quantity in quantities.items()
+            ])
+
+            # One conditional UPDATE takes the stock, anything short means a concurrent purchase won
+            try:
+                hold_stock(user, quantities, {purchase.Product_id: purchase for purchase in purchases})
+            except InsufficientStock:
+                raise ValidationError({"status": "error", "message": "Some products have insufficient stock."})
+
+            cart_items.update(status=STATUS_CHOICES[2][0])
 
     def update(self, request, *args, **kwargs):
         """
         Update the payment_status or order_status for a purchase.
+        * A purchase can only be paid while its stock is still held, once the hold expired the stock went back on sale
         """
-        instance = self.get_object()
         partial = kwargs.pop('partial', False)
-        serializer = self.get_serializer(instance, data=request.data, partial=partial)
-        if serializer.is_valid():
+        with transaction.atomic():
+            # Locking the holds keeps the expiry sweeper from releasing them between this check & their confirmation
+            purchase_id = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            held = list(lock_rows(StockReservation.objects.filter(purchase_id=purchase_id, reservation_status=RESERVATION_STATUS[0][0])).values_list('id', flat=True))
+            instance = self.get_object()
+            reservations = instance.stockreservation_purchase.all()
+
+            serializer = self.get_serializer(instance, data=request.data, partial=partial)
+            if not serializer.is_valid():
+                return Response({'status': 'validation_error', 'data': serializer.errors}, status= status.HTTP_400_BAD_REQUEST)
+
+            paying = serializer.validated_data.get('payment_status') and not instance.payment_status
+            if paying and not held and (instance.order_status == ORDER_STATUS[4][0] or reservations.exists()):
+                return Response({'status': 'error', 'data': 'The stock hold of this purchase expired, please order again.'}, status=status.HTTP_400_BAD_REQUEST)
             self.perform_update(serializer)
-        else:
-            return Response({'status': 'validation_error', 'data': serializer.errors}, status= status.HTTP_400_BAD_REQUEST)
+
+            # Paid purchases keep their held stock, cancelled ones give it back
+            if instance.order_status == ORDER_STATUS[4][0]:
+                release_holds(reservations)
+            elif instance.payment_status:
+                confirm_holds(reservations)
         return Response({'status': 'success', 'data': serializer.data}, status=status.HTTP_200_OK)
 
     def destroy(self, request, *args, **kwargs):
@@ -468,23 +596,23 @@ class ProductPurchaseViewSet(viewsets.ModelViewSet):
         Custom action to check if all cart items have sufficient stock.
         """
         user = request.user
-        cart_items = Cart.objects.filter(user=user)
-        
+        cart_items = Cart.objects.filter(user=user, status=STATUS_CHOICES[1][0])
+
+        # One joined query returns the lines asking for more than the product has left
+        insufficient_stock_items = [
+            {
+                "product_id": item['product_id'],
+                "product_name": item['product__name'],
+                "requested_quantity": item['quantity'],
+                "available_stock": item['product__stock']
+            }
+            for item in cart_items.filter(quantity__gt=F('product__stock')).values('product_id', 'product__name', 'quantity', 'product__stock')
+        ]
+
         # If the cart is empty, return a message
-        if not cart_items.exists():
+        if not insufficient_stock_items and not cart_items.exists():
             return Response({"status": "error", "message": "No items in the cart."}, status=status.HTTP_400_BAD_REQUEST)
 
-        insufficient_stock_items = []
-        for cart_item in cart_items:
-            product = cart_item.product
-            if cart_item.quantity > product.stock:
-                insufficient_stock_items.append({
-                    "product_id": product.id,
-                    "product_name": product.name,
-                    "requested_quantity": cart_item.quantity,
-                    "available_stock": product.stock
-                })
-
         if insufficient_stock_items:
             # Return the list of items with insufficient stock
             return Response({
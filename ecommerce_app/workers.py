@@ -0,0 +1,101 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import threading
+
+
+# Bounded Process Pools
+# * CPU heavy work (password hashing, ...) runs in child processes, off the threads serving requests
+# * Admission control: at most `max_workers + max_pending` calls are in flight, extra callers are turned away straight
+#   away instead of queueing behind work that would time out anyway
+
+
+class WorkerPoolBusy(Exception):
+    pass
+
+
+def init_django_worker(nice=0):
+    """
+    Initializer For Pool Processes, Sets Django Up & Lowers The Process Priority So Request Threads Win The CPU
+    """
+    if nice:
+        os.nice(nice)
+
+    import django
+    django.setup()
+
+
+class BoundedProcessPool:
+    def __init__(self, max_workers, max_pending, nice=0):
+        self.max_workers = max_workers
+        self.nice = nice
+        self.slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def get_executor(self):
+        # Started on first use, so every server worker process gets its own pool after the server forks
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=init_django_worker,
+                    initargs=(self.nice,),
+                )
+            return self.executor
+
+    def run(self, fn, *args, timeout=None):
+        """
+        Run `fn(*args)` In A Pool Process And Wait For The Result
+        * Raises WorkerPoolBusy when every slot is taken or the result doesn't come within `timeout` seconds
+        * A call that timed out keeps its slot until it really finishes, a running call can't be cancelled
+        """
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            raise WorkerPoolBusy()
+
+    def submit(self, fn, *args):
+        """
+        Start `fn(*args)` In A Pool Process Without Waiting, Returns Its Future
+        * Raises WorkerPoolBusy when every slot is taken, the slot is freed when the call finishes
+        """
+        if not self.slots.acquire(blocking=False):
+            raise WorkerPoolBusy()
+        executor = None
+        try:
+            executor = self.get_executor()
+            future = executor.submit(fn, *args)
+        except (BrokenProcessPool, OSError):
+            # A process that can't be started leaves the executor broken too, the next call starts a fresh one
+            self.slots.release()
+            if executor is not None:
+                self.discard(executor)
+            raise
+        except BaseException:
+            self.slots.release()
+            raise
+
+        def finished(future):
+            self.slots.release()
+            if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                self.discard(executor)
+
+        future.add_done_callback(finished)
+        return future
+
+    def discard(self, executor):
+        with self.lock:
+            if self.executor is executor:
+                self.executor = None
+        executor.shutdown(wait=False)
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None